@@ -0,0 +1,39 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[2] / "scripts"
+# Scripts import their shared helpers as siblings, as when run from the repo root.
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+
+def _load_script(name: str):
+    """Import ``scripts/<name>.py``; the file names contain dots, so not as a package."""
+    module_name = "script_" + name.replace(".", "_")
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, SCRIPTS_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except ImportError as exc:
+        del sys.modules[module_name]
+        pytest.skip(f"scripts/{name}.py dependencies not installed: {exc}")
+    return module
+
+
+@pytest.fixture
+def load_script():
+    return _load_script
+
+
+@pytest.fixture
+def helpers():
+    """``scripts/script_helpers.py``, the same module object the scripts import."""
+    import script_helpers
+
+    return script_helpers
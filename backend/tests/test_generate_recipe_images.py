@@ -0,0 +1,69 @@
+import json
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def images(load_script):
+    return load_script("generate_recipe_images")
+
+
+def _write_recipes(tmp_path, count):
+    files = []
+    for i in range(count):
+        path = tmp_path / f"r{i:03d}.json"
+        path.write_text(json.dumps({"title": f"T{i}", "description": "", "text": f"Recipe {i}"}))
+        files.append(path)
+    return files
+
+
+def test_iter_json_dir_yields_rows_in_order(images, tmp_path):
+    files = _write_recipes(tmp_path, 20)
+    rows = list(images.iter_json_dir(files, window=3))
+    assert [row["id"] for row in rows] == [p.stem for p in files]
+
+
+def test_iter_json_dir_parses_one_window_ahead(images, tmp_path, monkeypatch):
+    files = _write_recipes(tmp_path, 200)
+    parsed = []
+    lock = threading.Lock()
+    real_parse = images._parse_one
+
+    def counting_parse(p):
+        with lock:
+            parsed.append(p)
+        return real_parse(p)
+
+    monkeypatch.setattr(images, "_parse_one", counting_parse)
+    rows = images.iter_json_dir(files, window=8)
+    first = next(rows)
+    rows.close()
+
+    assert first["id"] == "r000"
+    # The window plus the one refill submitted before the first row was yielded.
+    assert len(parsed) <= 9
+
+
+def test_iter_json_dir_without_orjson(images, helpers, tmp_path, monkeypatch):
+    monkeypatch.setattr(helpers, "orjson", None)
+    files = _write_recipes(tmp_path, 3)
+    assert [row["text"] for row in images.iter_json_dir(files)] == ["Recipe 0", "Recipe 1", "Recipe 2"]
+
+
+def test_failures_round_trip_without_orjson(images, helpers, tmp_path, monkeypatch):
+    monkeypatch.setattr(helpers, "orjson", None)
+    path = tmp_path / "failures.jsonl"
+    images._save_failures(path, [("a", "boom"), ("b", None)])
+    assert images._load_failed_ids(path) == {"a", "b"}
+
+
+def test_failures_not_attempted_are_carried_over(images, tmp_path):
+    path = tmp_path / "failures.jsonl"
+    images._save_failures(path, [("a", "boom"), ("b", "boom"), ("c", "boom"), ("gone", "boom")])
+    files = [tmp_path / f"{rid}.json" for rid in ("a", "b", "c")]
+    (tmp_path / "c.jpg").write_bytes(b"img")
+
+    carried = images._carried_failures(path, files, files[:1], tmp_path, "jpg")
+
+    assert carried == [("b", "boom")]
@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("mistralai")
+
+FIELDS = {"title": "Tarte Tatin", "description": "Dessert aux pommes", "text": "Faire caraméliser les pommes."}
+
+
+@pytest.fixture
+def tr(load_script):
+    return load_script("generate_recipe_translations.mistral")
+
+
+def test_translate_language_keeps_field_order_with_cache_hits(tr, tmp_path, monkeypatch):
+    requested = []
+
+    async def fake_translate(client, model, fields, code):
+        requested.append(list(fields))
+        return {key: f"[{key}]" for key in fields}
+
+    monkeypatch.setattr(tr, "translate_recipe_into_language", fake_translate)
+    cache = tr.TranslationCache(str(tmp_path / "cache.sqlite"))
+    cache.put("model", "en", "description", FIELDS["description"], "Apple dessert")
+    fields = dict(FIELDS, text="4 - 6")
+
+    values = asyncio.run(tr._translate_language(None, "model", fields, "en", asyncio.Semaphore(1), cache))
+    cache.close()
+
+    assert requested == [["title"]]
+    assert list(values) == ["title", "description", "text"]
+    assert values == {"title": "[title]", "description": "Apple dessert", "text": "4 - 6"}
@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("ollama")
+pytest.importorskip("tiktoken")
+
+RECIPE = {
+    "title": "Tarte Tatin",
+    "description": "Dessert aux pommes",
+    "text": "Faire caraméliser les pommes dans le beurre et le sucre, puis couvrir de pâte et enfourner.",
+}
+
+
+class FakeClient:
+    """Echo client recording which field each per-field request translates."""
+
+    def __init__(self, field_names):
+        self.field_names = field_names
+        self.requested = []
+
+    async def chat(self, model, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        field = next(name for name in self.field_names if f"`{name}`" in prompt)
+        self.requested.append(field)
+        return {"message": {"content": f"[{field}]"}}
+
+
+@pytest.fixture
+def tr(load_script, monkeypatch):
+    module = load_script("generate_recipe_translations.ollama")
+    monkeypatch.setattr(module, "_USE_CHAT", True)
+    return module
+
+
+def test_translate_recipe_schedules_longest_first_but_keeps_field_order(tr):
+    client = FakeClient(tr.FIELD_PROMPT_NAMES.values())
+
+    translated = asyncio.run(
+        tr.translate_recipe(client, "model", RECIPE, ["fr", "en", "de"], asyncio.Semaphore(1), per_field=True)
+    )
+
+    assert client.requested[0] == "recipe text"
+    assert list(translated) == [
+        f"{key}_{code}" for code in ("fr", "en", "de") for key in ("title", "description", "text")
+    ]
+    assert translated["text_en"] == "[recipe text]"
+
+
+def test_translate_recipe_copies_language_agnostic_fields(tr):
+    client = FakeClient(tr.FIELD_PROMPT_NAMES.values())
+    recipe = dict(RECIPE, description="4 - 6")
+
+    translated = asyncio.run(tr.translate_recipe(client, "model", recipe, ["en"], asyncio.Semaphore(1), per_field=True))
+
+    assert list(translated)[3:] == ["title_en", "description_en", "text_en"]
+    assert translated["description_en"] == "4 - 6"
+    assert "description" not in client.requested
+
+
+def test_every_context_bucket_is_reachable(tr):
+    reachable = {tr.context_size(prompt_tokens) for prompt_tokens in range(1, tr.CTX_BUCKETS[-1])}
+    assert reachable == set(tr.CTX_BUCKETS)
+
+
+def test_generation_options_count_bucket_hits(tr, monkeypatch, capsys):
+    monkeypatch.setattr(tr, "_CTX_BUCKET_HITS", tr.collections.Counter())
+    monkeypatch.setattr(tr, "_DEBUG", True)
+
+    small = tr._generation_options(200, 100)
+    large = tr._generation_options(2500, 2000)
+
+    assert small == {"num_ctx": 2048, "num_predict": 1848}
+    assert large["num_ctx"] == 8192
+    assert tr._CTX_BUCKET_HITS == {2048: 1, 8192: 1}
+    assert "num_ctx=2048 for 200 prompt tokens" in capsys.readouterr().out
+
+
+class JsonModeClient(FakeClient):
+    """Answers JSON-mode calls with ``answer``, or raises it when it is an exception."""
+
+    def __init__(self, field_names, answer):
+        super().__init__(field_names)
+        self.answer = answer
+        self.json_calls = 0
+
+    async def chat(self, model, messages, **kwargs):
+        if kwargs.get("format") != "json":
+            return await super().chat(model, messages, **kwargs)
+        self.json_calls += 1
+        if isinstance(self.answer, BaseException):
+            raise self.answer
+        return {"message": {"content": self.answer}}
+
+
+def test_malformed_json_falls_back_to_per_field(tr):
+    client = JsonModeClient(tr.FIELD_PROMPT_NAMES.values(), "not json")
+
+    translated = asyncio.run(tr.translate_recipe(client, "model", RECIPE, ["en"], asyncio.Semaphore(2)))
+
+    assert client.json_calls == 1
+    assert sorted(client.requested) == ["description", "recipe text", "title"]
+    assert translated["title_en"] == "[title]"
+
+
+def test_transport_errors_skip_the_per_field_fallback(tr):
+    client = JsonModeClient(tr.FIELD_PROMPT_NAMES.values(), ConnectionError("connection refused"))
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(tr.translate_recipe(client, "model", RECIPE, ["en"], asyncio.Semaphore(2)))
+
+    assert client.json_calls == 1
+    assert client.requested == []
+
+
+def test_fields_too_long_together_are_translated_one_by_one(tr, monkeypatch, capsys):
+    monkeypatch.setattr(tr, "CTX_BUCKETS", (2048,))
+    client = JsonModeClient(tr.FIELD_PROMPT_NAMES.values(), "{}")
+    recipe = dict(RECIPE, description=" ".join(["sucre"] * 300), text=" ".join(["pomme"] * 500))
+
+    translated = asyncio.run(tr.translate_recipe(client, "model", recipe, ["en"], asyncio.Semaphore(2)))
+
+    assert client.json_calls == 0
+    assert translated["text_en"] == "[recipe text]"
+    assert "exceed the largest context (2048)" in capsys.readouterr().out
+
+
+def test_field_too_long_for_any_context_is_not_sent(tr, monkeypatch):
+    monkeypatch.setattr(tr, "CTX_BUCKETS", (2048,))
+    client = FakeClient(tr.FIELD_PROMPT_NAMES.values())
+    recipe = dict(RECIPE, text=" ".join(["pomme"] * 1500))
+
+    with pytest.raises(tr.ContextOverflowError):
+        asyncio.run(tr.translate_recipe(client, "model", recipe, ["en"], asyncio.Semaphore(2), per_field=True))
+
+    assert "recipe text" not in client.requested
@@ -0,0 +1,110 @@
+import httpx
+import pytest
+
+pytest.importorskip("mistralai")
+pytest.importorskip("pandas")
+
+from mistralai.models import SDKError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def gen(load_script):
+    return load_script("generate_recipes.mistral")
+
+
+@pytest.fixture
+def clock(gen, monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(gen.time, "monotonic", fake.monotonic)
+    monkeypatch.setattr(gen.time, "sleep", fake.sleep)
+    return fake
+
+
+def test_token_bucket_paces_requests_per_minute(gen, clock):
+    bucket = gen.TokenBucket(rpm=2, tpm=0)
+    for _ in range(4):
+        bucket.acquire(100)
+    # Two requests fit the initial budget, then one every 30 seconds.
+    assert clock.sleeps == pytest.approx([30.0, 30.0])
+
+
+def test_token_bucket_paces_tokens_per_minute(gen, clock):
+    bucket = gen.TokenBucket(rpm=0, tpm=60_000)
+    for _ in range(3):
+        bucket.acquire(50_000)
+    assert clock.now == pytest.approx(90.0)
+
+
+def test_token_bucket_fractional_rpm_does_not_hang(gen, clock):
+    bucket = gen.TokenBucket(rpm=0.5, tpm=0)
+    bucket.acquire(1)
+    bucket.acquire(1)
+    assert clock.now == pytest.approx(120.0)
+
+
+def test_token_bucket_zero_disables_limits(gen, clock):
+    bucket = gen.TokenBucket(rpm=0, tpm=0)
+    for _ in range(100):
+        bucket.acquire(10**9)
+    assert clock.sleeps == []
+
+
+def _rate_limited(retry_after=None):
+    headers = {"Retry-After": retry_after} if retry_after is not None else {}
+    response = httpx.Response(429, headers=headers, request=httpx.Request("POST", "https://api.mistral.ai"))
+    return SDKError("rate limited", response, "")
+
+
+class FakeChat:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def complete(self, model, messages, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        message = type("Message", (), {"content": "# Recette"})()
+        choice = type("Choice", (), {"message": message})()
+        return type("Response", (), {"choices": [choice]})()
+
+
+class FakeClient:
+    def __init__(self, errors):
+        self.chat = FakeChat(errors)
+
+
+def test_generate_recipe_text_honours_retry_after(gen, clock, monkeypatch):
+    fake = FakeClient([_rate_limited("7")])
+    monkeypatch.setattr(gen, "client", fake)
+    assert gen.generate_recipe_text("model", "Quiche", "Tarte salée") == "# Recette"
+    assert fake.chat.calls == 2
+    assert clock.sleeps == [7.0]
+
+
+def test_generate_recipe_text_backs_off_without_retry_after(gen, clock, monkeypatch):
+    fake = FakeClient([_rate_limited(), _rate_limited()])
+    monkeypatch.setattr(gen, "client", fake)
+    assert gen.generate_recipe_text("model", "Quiche", "Tarte salée") == "# Recette"
+    assert clock.sleeps == [2.0, 4.0]
+
+
+def test_generate_recipe_text_gives_up_after_retries(gen, clock, monkeypatch):
+    fake = FakeClient([_rate_limited("1")] * gen.RETRY_ATTEMPTS)
+    monkeypatch.setattr(gen, "client", fake)
+    with pytest.raises(SDKError):
+        gen.generate_recipe_text("model", "Quiche", "Tarte salée")
+    assert fake.chat.calls == gen.RETRY_ATTEMPTS
@@ -0,0 +1,108 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def outputs(load_script):
+    return load_script("recipe_outputs")
+
+
+def test_build_entries_keeps_first_of_duplicate_titles(outputs, tmp_path, capsys):
+    records = [
+        {"title": "Tarte", "description": "aux pommes"},
+        {"title": "Soupe", "description": "à l'oignon"},
+        {"title": "Tarte", "description": "aux poires"},
+    ]
+    entries = outputs.build_entries(records, str(tmp_path))
+
+    assert [(e["title"], e["description"]) for e in entries] == [("Tarte", "aux pommes"), ("Soupe", "à l'oignon")]
+    assert [e["index"] for e in entries] == [0, 1]
+    assert "row 3: Tarte" in capsys.readouterr().out
+
+
+def test_written_recipe_is_skipped_until_its_prompt_changes(outputs, helpers, tmp_path):
+    output_dir = str(tmp_path)
+    (entry,) = outputs.build_entries([{"title": "Tarte", "description": "aux pommes"}], output_dir)
+
+    helpers.write_json(entry["out_path"], {"title": "Tarte", "description": "aux pommes", "text": "..."})
+    outputs.record_prompt_key(entry, {})
+    assert not os.path.exists(entry["out_path"] + ".tmp")
+
+    existing = outputs.list_existing(output_dir)
+    assert outputs.recipe_exists(entry, existing, outputs.load_prompt_keys(output_dir))
+
+    (edited,) = outputs.build_entries([{"title": "Tarte", "description": "aux poires"}], output_dir)
+    assert not outputs.recipe_exists(edited, existing, outputs.load_prompt_keys(output_dir))
+
+
+def test_unkeyed_and_legacy_files_count_as_current(outputs, tmp_path):
+    output_dir = str(tmp_path)
+    old, legacy = outputs.build_entries(
+        [{"title": "Tarte", "description": "aux pommes"}, {"title": "Soupe", "description": "à l'oignon"}],
+        output_dir,
+    )
+    open(old["out_path"], "w").close()
+    open(legacy["legacy_path"], "w").close()
+
+    existing = outputs.list_existing(output_dir)
+    assert outputs.recipe_exists(old, existing, {})
+    assert outputs.recipe_exists(legacy, existing, {})
+
+
+def test_strip_trailing_periods_leaves_missing_and_non_string_values(outputs):
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    descriptions = pd.Series(["Tarte aux pommes.", np.nan, None, 5, 2.5, "Sans point", "Trois..."], dtype=object)
+
+    stripped = outputs.strip_trailing_periods(descriptions).tolist()
+
+    assert stripped[0] == "Tarte aux pommes"
+    assert np.isnan(stripped[1])
+    assert stripped[2] is None
+    assert stripped[3] == 5 and isinstance(stripped[3], int)
+    assert stripped[4] == 2.5 and isinstance(stripped[4], float)
+    assert stripped[5:] == ["Sans point", "Trois.."]
+
+
+def test_strip_trailing_periods_on_csv_column(outputs, tmp_path):
+    pd = pytest.importorskip("pandas")
+    csv_path = tmp_path / "recipes.csv"
+    csv_path.write_text("title,description\nTarte,Dessert.\nSoupe,\n", encoding="utf-8")
+    recipes = pd.read_csv(csv_path)
+
+    stripped = outputs.strip_trailing_periods(recipes["description"])
+
+    assert stripped[0] == "Dessert"
+    assert pd.isna(stripped[1])
+
+
+def test_strip_trailing_periods_on_column_without_strings(outputs):
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    descriptions = pd.Series([np.nan, np.nan])
+
+    stripped = outputs.strip_trailing_periods(descriptions)
+
+    assert stripped.isna().all()
+
+
+def test_source_keys_flag_outputs_of_regenerated_recipes(outputs, tmp_path):
+    recipes_dir = tmp_path / "recipes"
+    output_dir = tmp_path / "translations"
+    recipes_dir.mkdir()
+    output_dir.mkdir()
+    (entry,) = outputs.build_entries([{"title": "Tarte", "description": "aux pommes"}], str(recipes_dir))
+    rid = entry["file_hash"]
+    outputs.record_prompt_key(entry, {})
+
+    # An output made before keys were tracked is adopted as current.
+    assert outputs.SourceKeys(str(output_dir), str(recipes_dir)).stale([rid, "unknown"]) == set()
+
+    (edited,) = outputs.build_entries([{"title": "Tarte", "description": "aux poires"}], str(recipes_dir))
+    outputs.record_prompt_key(edited, {})
+    keys = outputs.SourceKeys(str(output_dir), str(recipes_dir))
+    assert keys.stale([rid]) == {rid}
+
+    keys.record(rid)
+    assert outputs.SourceKeys(str(output_dir), str(recipes_dir)).stale([rid]) == set()
@@ -0,0 +1,35 @@
+import pytest
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_write_json_round_trip(helpers, tmp_path, monkeypatch, use_orjson):
+    if use_orjson and helpers.orjson is None:
+        pytest.skip("orjson not installed")
+    if not use_orjson:
+        monkeypatch.setattr(helpers, "orjson", None)
+    path = str(tmp_path / "recipe.json")
+    data = {"title": "Crème brûlée", "text": "..."}
+
+    helpers.write_json(path, data)
+
+    assert helpers.read_json(path) == data
+    assert not (tmp_path / "recipe.json.tmp").exists()
+    assert "Crème" in (tmp_path / "recipe.json").read_text(encoding="utf-8")
+
+
+def test_strip_code_fence(helpers):
+    assert helpers.strip_code_fence("```markdown\n# Tarte\n```") == "# Tarte"
+    assert helpers.strip_code_fence("# Tarte\n```py\nx\n```\nfin") == "# Tarte\n```py\nx\n```\nfin"
+
+
+def test_probe_chat_reports_failures(helpers):
+    class NoChat:
+        def chat(self, **kwargs):
+            raise RuntimeError("404")
+
+    class Chat:
+        def chat(self, **kwargs):
+            return {}
+
+    assert helpers.probe_chat(Chat(), "model") is True
+    assert helpers.probe_chat(NoChat(), "model") is False
@@ -137,6 +137,8 @@ if [[ "$SYNC_IMAGES" == "true" ]]; then
       -v "${REPO_ROOT}/data/images:/images:ro" \
       amazon/aws-cli s3 sync /images "s3://${SCW_S3_BUCKET}/images" \
         --endpoint-url "$SCW_S3_ENDPOINT" \
+        --exclude '.state/*' \
+        --exclude '.by-hash/*' \
         --acl public-read \
         --cache-control 'public, max-age=31536000, immutable'
   else
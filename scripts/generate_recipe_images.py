@@ -6,32 +6,57 @@ Behavior
 - For each recipe, generates one image using the recipe text plus an instruction:
   "Generate a picture of the recipe as if it was in your plate."
 - Saves images to an output directory using the recipe ID as filename.
+- Recipes with an identical prompt share one generated image: it is stored once
+  under `<images-dir>/.by-hash/` and hardlinked to each recipe ID.
 
 Notes
-- Requires: pip install openai pandas pyarrow
+- Requires: pip install openai (optionally orjson for faster JSON, h2 for HTTP/2)
 - Set OPENAI_API_KEY in your environment for authentication.
 
 Usage examples
   python scripts/generate_recipe_images.py
   python scripts/generate_recipe_images.py --images-dir data/images
   python scripts/generate_recipe_images.py --json-dir data/json_recipes --overwrite
+  python scripts/generate_recipe_images.py --retry-failed
 """
 
 from __future__ import annotations
 
 import argparse
 import base64
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+import hashlib
+import os
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+import queue
+import shutil
+import threading
+import time
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 import sys
 
+from recipe_outputs import SourceKeys
+from script_helpers import build_http_client, json_dumps, json_loads
+
+
+DISK_WRITERS = 2
+# Files parsed ahead of the consumer, per CPU: enough to keep the pool busy, not the whole dir.
+PARSE_WINDOW_PER_CPU = 4
+QUEUE_DEPTH_PER_WORKER = 4
+# Failures of the last run, one {"id", "error"} object per line, under the images dir.
+FAILURES_PATH = Path(".state") / "failures.jsonl"
+# Content-addressed images, hardlinked to every recipe id sharing the same prompt.
+BY_HASH_DIR = ".by-hash"
+# AIMD concurrency control: +1 slot every N successes, halve on rate limiting.
+AIMD_INCREASE_EVERY = 30
+AIMD_LOG_EVERY = 100
+RATE_LIMIT_RETRIES = 3
+RATE_LIMIT_BACKOFF_SECONDS = 5.0
+
 
 def _require_deps():
-    try:
-        import pandas as pd  # noqa: F401
-    except Exception:
-        print("Error: pandas is required. Install with: pip install pandas", file=sys.stderr)
-        raise
     try:
         from openai import OpenAI  # noqa: F401
     except Exception:
@@ -39,30 +64,149 @@ def _require_deps():
         raise
 
 
-def _load_from_json_dir(dir_path: Path) -> "pd.DataFrame":
-    import pandas as pd
-    import json
-
-    files = sorted(dir_path.rglob("*.json"))
-    rows: List[Dict[str, Any]] = []
-    for p in files:
+def _parse_one(p: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with p.open("rb") as f:
+            data = json_loads(f.read())
+    except Exception as e:
+        print(f"Skipping unreadable JSON {p}: {e}")
+        return None
+    text = (data.get("text") or "").strip()
+    if not text:
+        return None
+    return {
+        "id": p.stem,
+        "title": (data.get("title") or "").strip(),
+        "description": (data.get("description") or "").strip(),
+        "text": text,
+        "path": str(p),
+    }
+
+
+def iter_json_dir(files: Iterable[Path], window: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Lazily yield recipe rows from JSON files, in order, parsing them on a thread pool.
+
+    At most ``window`` files are parsed ahead of the consumer (``pool.map`` would
+    submit every file up front and hold all parsed recipes in memory).
+    """
+    workers = os.cpu_count() or 1
+    window = max(1, window or workers * PARSE_WINDOW_PER_CPU)
+    paths = iter(files)
+    pending: Deque[Future] = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
         try:
-            with p.open("r", encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception as e:
-            print(f"Skipping unreadable JSON {p}: {e}")
-            continue
-        text = (data.get("text") or "").strip()
-        if not text:
-            continue
-        rows.append({
-            "id": p.stem,
-            "title": (data.get("title") or "").strip(),
-            "description": (data.get("description") or "").strip(),
-            "text": text,
-            "path": str(p),
-        })
-    return pd.DataFrame.from_records(rows) if rows else pd.DataFrame(columns=["id", "title", "description", "text", "path"])  # type: ignore[name-defined]
+            for p in paths:
+                pending.append(pool.submit(_parse_one, p))
+                if len(pending) >= window:
+                    break
+            while pending:
+                row = pending.popleft().result()
+                # Refill before yielding so parsing overlaps with the consumer.
+                p = next(paths, None)
+                if p is not None:
+                    pending.append(pool.submit(_parse_one, p))
+                if row is not None:
+                    yield row
+        finally:
+            for fut in pending:
+                fut.cancel()
+
+
+@dataclass(frozen=True, slots=True)
+class ImgCfg:
+    """Run-constant image settings, built once in main and shared by all workers."""
+
+    outdir: Path
+    size: str
+    quality: str
+    fmt: str
+    overwrite: bool
+    source_keys: Optional[SourceKeys] = None
+
+
+class _RunStats:
+    """Thread-safe counters shared by the API workers and the disk writers."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.successes = 0
+        self.skips = 0
+        self.reuses = 0
+        self.failures: List[Tuple[str, Optional[str]]] = []
+
+    def reused(self) -> None:
+        with self._lock:
+            self.reuses += 1
+
+    def failed(self, rid: str, msg: Optional[str]) -> None:
+        with self._lock:
+            self.failures.append((rid, msg))
+
+    def written(self, rid: str, fut: Future) -> None:
+        exc = fut.exception()
+        if exc is not None:
+            self.failed(rid, str(exc))
+            return
+        with self._lock:
+            self.successes += 1
+
+
+class _AimdLimiter:
+    """Cap on in-flight API requests, tuned from live rate-limit feedback (AIMD)."""
+
+    def __init__(self, start: int, maximum: int) -> None:
+        self._cond = threading.Condition()
+        self.limit = max(1, min(start, maximum))
+        self._max = maximum
+        self._active = 0
+        self._streak = 0
+        self._completed = 0
+
+    def __enter__(self) -> "_AimdLimiter":
+        with self._cond:
+            while self._active >= self.limit:
+                self._cond.wait()
+            self._active += 1
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+
+    def success(self) -> None:
+        with self._cond:
+            self._completed += 1
+            self._streak += 1
+            if self._streak >= AIMD_INCREASE_EVERY and self.limit < self._max:
+                self.limit += 1
+                self._streak = 0
+                self._cond.notify()
+            if self._completed % AIMD_LOG_EVERY == 0:
+                print(f"   Concurrency: {self.limit} after {self._completed} completed requests")
+
+    def rate_limited(self) -> None:
+        with self._cond:
+            self._streak = 0
+            self.limit = max(1, self.limit // 2)
+            print(f"   Rate limited, concurrency reduced to {self.limit}")
+
+
+class _SharedImages:
+    """One future per prompt hash, so duplicate prompts wait on a single generation."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._futures: Dict[str, Future] = {}
+
+    def claim(self, key: str) -> Tuple[Future, bool]:
+        """Return the future for ``key`` and whether the caller must produce it."""
+        with self._lock:
+            fut = self._futures.get(key)
+            if fut is not None:
+                return fut, False
+            fut = self._futures[key] = Future()
+            return fut, True
 
 
 def _ensure_outdir(path: Path) -> None:
@@ -74,6 +218,42 @@ def _build_prompt(text: str) -> str:
     return f"{text.strip()}" + suffix
 
 
+def _load_failures(path: Path) -> List[Tuple[str, Optional[str]]]:
+    try:
+        with path.open("rb") as f:
+            records = [json_loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+    return [(record["id"], record.get("error")) for record in records]
+
+
+def _load_failed_ids(path: Path) -> Set[str]:
+    return {rid for rid, _ in _load_failures(path)}
+
+
+def _carried_failures(
+    path: Path, files: List[Path], attempted: List[Path], outdir: Path, fmt: str
+) -> List[Tuple[str, Optional[str]]]:
+    """Earlier failures this run did not attempt (--limit, --retry-failed subsets).
+
+    They stay listed until they get an image; recipes no longer in the input drop out.
+    """
+    known = {p.stem for p in files}
+    tried = {p.stem for p in attempted}
+    return [
+        (rid, msg)
+        for rid, msg in _load_failures(path)
+        if rid in known and rid not in tried and not (outdir / f"{rid}.{fmt}").exists()
+    ]
+
+
+def _save_failures(path: Path, failures: List[Tuple[str, Optional[str]]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("wb") as f:
+        for rid, msg in failures:
+            f.write(json_dumps({"id": rid, "error": msg}) + b"\n")
+
+
 def _gen_image_bytes(client, prompt: str, size: str, quality: str) -> bytes:
     # Use Images API to generate an image.
     resp = client.images.generate(
@@ -87,15 +267,111 @@ def _gen_image_bytes(client, prompt: str, size: str, quality: str) -> bytes:
     return base64.b64decode(b64)
 
 
+def _gen_image_limited(client, limiter: _AimdLimiter, prompt: str, size: str, quality: str) -> bytes:
+    from openai import RateLimitError
+
+    attempt = 0
+    while True:
+        attempt += 1
+        with limiter:
+            try:
+                img = _gen_image_bytes(client, prompt=prompt, size=size, quality=quality)
+            except RateLimitError:
+                limiter.rate_limited()
+                if attempt >= RATE_LIMIT_RETRIES:
+                    raise
+            else:
+                limiter.success()
+                return img
+        time.sleep(RATE_LIMIT_BACKOFF_SECONDS * attempt)
+
+
 def _save_image(path: Path, data: bytes) -> None:
     with path.open("wb") as f:
         f.write(data)
 
 
+def _link_image(src: Path, dst: Path) -> None:
+    if dst.exists():
+        dst.unlink()
+    try:
+        os.link(src, dst)
+    except OSError:
+        # Filesystem without hardlink support: fall back to a plain copy.
+        shutil.copyfile(src, dst)
+
+
+def _resolve(shared: Future, write: Future, path: Path) -> None:
+    exc = write.exception()
+    if exc is not None:
+        shared.set_exception(exc)
+    else:
+        shared.set_result(path)
+
+
+def _worker(
+    client,
+    row: Dict[str, Any],
+    cfg: ImgCfg,
+    disk_pool: ThreadPoolExecutor,
+    shared_images: _SharedImages,
+    limiter: _AimdLimiter,
+    stats: _RunStats,
+) -> None:
+    rid = str(row.get("id", "")).strip() or str(row.get("title", "")).strip()
+    if not rid:
+        stats.failed("<missing-id>", "missing id/title")
+        return
+
+    out_path = cfg.outdir / f"{rid}.{cfg.fmt}"
+    prompt = _build_prompt(f"{row['title']}\n{row['description']}\n{row['text']}")
+    key = hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).hexdigest()
+    shared_path = cfg.outdir / BY_HASH_DIR / f"{key}.{cfg.fmt}"
+
+    def _on_ready(f: Future) -> None:
+        if f.exception() is None:
+            try:
+                _link_image(shared_path, out_path)
+            except OSError as e:
+                stats.failed(rid, str(e))
+                return
+            if cfg.source_keys is not None:
+                cfg.source_keys.record(rid)
+        stats.written(rid, f)
+
+    shared, owner = shared_images.claim(key)
+    if not owner:
+        print(f"Reuse image for {row['title']} ({rid})...")
+        stats.reused()
+    elif shared_path.exists() and not cfg.overwrite:
+        shared.set_result(shared_path)
+    else:
+        print(f"Generate image for {row['title']} ({rid})...")
+        try:
+            img = _gen_image_limited(client, limiter, prompt=prompt, size=cfg.size, quality=cfg.quality)
+        except Exception as e:
+            shared.set_exception(e)
+        else:
+            # Hand the write to the disk pool so this thread can go back to the API.
+            write = disk_pool.submit(_save_image, shared_path, img)
+            write.add_done_callback(lambda w: _resolve(shared, w, shared_path))
+    shared.add_done_callback(_on_ready)
+
+
+def _consume(q: "queue.Queue[Optional[Dict[str, Any]]]", client, *worker_args: Any) -> None:
+    while True:
+        row = q.get()
+        try:
+            if row is None:
+                return
+            _worker(client, row, *worker_args)
+        finally:
+            q.task_done()
+
+
 def main():
     _require_deps()
     from openai import OpenAI
-    import pandas as pd
 
     parser = argparse.ArgumentParser(description="Generate images for recipes using gpt-image-1")
     src = parser.add_mutually_exclusive_group()
@@ -107,65 +383,126 @@ def main():
     parser.add_argument("--quality", type=str, default="low", choices=["low", "medium", "high", "auto"], help="Image quality for generation")
     parser.add_argument("--overwrite", action="store_true", help="Overwrite existing image files")
     parser.add_argument("--limit", type=int, default=None, help="Optional max number of images to generate")
+    parser.add_argument("--concurrency", type=int, default=4, help="Initial number of parallel image generation requests")
+    parser.add_argument("--max-concurrency", type=int, default=None, help="Upper bound for adaptive concurrency (default: 4x --concurrency)")
+    parser.add_argument("--retry-failed", action="store_true", help=f"Only retry recipes listed in <images-dir>/{FAILURES_PATH} by the previous run")
 
 
     args = parser.parse_args()
+    args.format = "jpg" if args.format == "jpeg" else args.format
+    concurrency = max(1, args.concurrency)
+    max_concurrency = max(concurrency, args.max_concurrency or concurrency * 4)
 
     outdir = Path(args.images_dir)
     _ensure_outdir(outdir)
+    _ensure_outdir(outdir / BY_HASH_DIR)
+    failures_path = outdir / FAILURES_PATH
 
     # Load data
-    df = None
+    files: List[Path] = []
     if args.json_dir:
         dir_path = Path(args.json_dir)
         if not dir_path.exists():
             print(f"JSON directory not found: {dir_path}", file=sys.stderr)
             sys.exit(1)
-        df = _load_from_json_dir(dir_path)
+        files = sorted(dir_path.rglob("*.json"))
 
-    if df is None or df.empty:
+    if args.retry_failed:
+        if not failures_path.exists():
+            print(f"No failures recorded at {failures_path}; nothing to retry.")
+            sys.exit(0)
+        failed_ids = _load_failed_ids(failures_path)
+        files = [p for p in files if p.stem in failed_ids]
+
+    if not files:
         print("No recipes found to generate images.")
         sys.exit(0)
 
+    # Drop recipes that already have an image before parsing or queueing them.
+    todo = files
+    source_keys = SourceKeys(str(outdir), args.json_dir) if args.json_dir else None
+    if not args.overwrite:
+        existing = {e.name for e in os.scandir(outdir) if e.is_file()}
+        if source_keys is not None:
+            # Images of recipes regenerated since they were drawn are redone.
+            suffix = f".{args.format}"
+            stale = source_keys.stale(name[: -len(suffix)] for name in existing if name.endswith(suffix))
+            if stale:
+                print(f"Regenerating images for {len(stale)} recipes regenerated since their image.")
+                existing -= {f"{rid}{suffix}" for rid in stale}
+        todo = [p for p in files if f"{p.stem}.{args.format}" not in existing]
+    skips = len(files) - len(todo)
+
     # Apply limit
     if args.limit is not None and args.limit >= 0:
-        df = df.head(args.limit)
-
-    total = len(df)
-    print(f"Generating images for {total} recipes → {outdir} (size={args.size}, quality={args.quality})")
-
-    client = OpenAI()
-    successes = 0
-    skips = 0
-    failures: List[Tuple[str, Optional[str]]] = []
-
-    img_fmt = args.format if args.format != "jpeg" else "jpg"
+        todo = todo[: args.limit]
 
-    for _, row in df.iterrows():
-        rid = str(row.get("id", "")).strip() or str(row.get("title", "")).strip()
-        if not rid:
-            failures.append(("<missing-id>", "missing id/title"))
-            continue
+    # Recipes are streamed: images start as soon as the first files are parsed.
+    rows: Iterator[Dict[str, Any]] = iter_json_dir(todo)
 
-        out_path = outdir / f"{rid}.{img_fmt}"
-        if out_path.exists() and not args.overwrite:
-            print(f"Skip {row["title"]} ({out_path})...")
-            skips += 1
-            continue
+    print(
+        f"Generating images for {len(todo)} new recipes (skipping {skips}) → {outdir} "
+        f"(size={args.size}, quality={args.quality})"
+    )
 
-        print(f"Generate image for {row["title"]} ({rid})...")
-        prompt = _build_prompt(f"{row['title']}\n{row['description']}\n{row['text']}")
-        try:
-            img = _gen_image_bytes(client, prompt=prompt, size=args.size, quality=args.quality)
-            _save_image(out_path, img)
-            successes += 1
-        except Exception as e:
-            failures.append((rid, str(e)))
+    client = OpenAI(http_client=build_http_client(max(32, max_concurrency * 2)))
+    stats = _RunStats()
+    stats.skips = skips
+    shared_images = _SharedImages()
+    # One thread per potential slot; the limiter decides how many call the API at once.
+    limiter = _AimdLimiter(start=concurrency, maximum=max_concurrency)
+
+    # Run-constant settings, shared by reference with every worker.
+    cfg = ImgCfg(
+        outdir=outdir,
+        size=args.size,
+        quality=args.quality,
+        fmt=args.format,
+        overwrite=args.overwrite,
+        source_keys=source_keys,
+    )
 
-    print(f"Done. Generated: {successes}, Skipped: {skips}, Failed: {len(failures)}")
+    # Images are written by a small dedicated pool so the API workers can
+    # issue the next request instead of waiting on disk.
+    disk_pool = ThreadPoolExecutor(max_workers=DISK_WRITERS)
+
+    # Bounded queue between the row stream and the API workers: together with
+    # the bounded parse window in iter_json_dir, at most a few windows of parsed
+    # recipes are in memory, whatever the number of files.
+    q: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max_concurrency * QUEUE_DEPTH_PER_WORKER)
+    workers = [
+        threading.Thread(
+            target=_consume,
+            args=(q, client, cfg, disk_pool, shared_images, limiter, stats),
+            daemon=True,
+        )
+        for _ in range(max_concurrency)
+    ]
+    for t in workers:
+        t.start()
+
+    for row in rows:
+        q.put(row)
+    for _ in workers:
+        q.put(None)
+    for t in workers:
+        t.join()
+    disk_pool.shutdown(wait=True)
+
+    failures = stats.failures
+    carried = _carried_failures(failures_path, files, todo, outdir, args.format)
+    _save_failures(failures_path, carried + failures)
+    print(
+        f"Done. Generated: {stats.successes} (reused {stats.reuses} duplicates), "
+        f"Skipped: {stats.skips}, Failed: {len(failures)}"
+    )
     if failures:
         preview = ", ".join(f"{rid}: {msg}" for rid, msg in failures[:10])
         print(f"Example failures (first 10): {preview}")
+    if carried:
+        print(f"Kept {len(carried)} earlier failures that were not retried in this run.")
+    if failures or carried:
+        print(f"Failure list saved to {failures_path}; rerun with --retry-failed to retry them.")
 
 
 if __name__ == "__main__":
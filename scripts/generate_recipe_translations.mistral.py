@@ -1,25 +1,66 @@
 import argparse
+import asyncio
+import functools
+import hashlib
+import io
 import json
 import os
+import re
+import sqlite3
 import sys
 import time
-import tempfile
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Dict, Iterable, List, Optional, Tuple
 
 try:
+    import httpx
     from mistralai import Mistral
+    from mistralai.models import SDKError
     from mistralai.models.file import File
 except Exception:
     print("Error: The 'mistralai' Python package is required to run this script.")
     print("Install with: pip install mistralai")
     raise
 
+from recipe_outputs import SourceKeys
+from script_helpers import (
+    build_async_http_client,
+    build_http_client,
+    fsync_dir,
+    json_dumps,
+    json_loads,
+    read_json,
+    strip_code_fence,
+    write_json,
+)
+
 
 TRANSLATOR_LLM = "mistral-small-latest"
 API_KEY_ENV = "MISTRAL_API_KEY"
 BATCH_POLL_INTERVAL_ENV = "MISTRAL_BATCH_POLL_INTERVAL"
 BATCH_TIMEOUT_MINUTES_ENV = "MISTRAL_BATCH_TIMEOUT_MINUTES"
+CACHE_PATH_ENV = "TRANSLATION_CACHE_PATH"
+DEFAULT_CACHE_PATH = "data/translation_cache.sqlite"
 DEFAULT_TARGET_LANGUAGES = []
+HTTP_POOL_SIZE = 64
+DEFAULT_CONCURRENCY = 8
+PARALLEL_ENV = "MISTRAL_PARALLEL"
+DEFAULT_PARALLEL = 16
+RETRY_ATTEMPTS = 4
+RETRY_MAX_DELAY = 30.0
+BATCH_CHUNK_SIZE = 100
+BATCH_MAX_ROUNDS = 3
+BATCH_ACTIVE_STATUSES = ("QUEUED", "RUNNING")
+BATCH_POLL_BACKOFF = 1.5
+BATCH_POLL_MAX_INTERVAL = 30.0
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Name of each recipe field as it appears in the translation prompts.
+FIELD_PROMPT_NAMES = {
+    "title": "title",
+    "description": "description",
+    "text": "recipe text",
+}
 
 
 LANGUAGE_NAMES = {
@@ -46,6 +87,12 @@ LANGUAGE_NAMES = {
     "zh": "Chinese",
 }
 
+SYSTEM_MESSAGE = {"role": "system", "content": "Never wrap your answer in Markdown code fences."}
+
+_LANGUAGE_SEPARATORS_RE = re.compile(r"[,;\s]+")
+# Texts made only of digits, punctuation and whitespace read the same in every language.
+_LANGUAGE_AGNOSTIC_RE = re.compile(r"^[\W\d_\s]*$")
+
 
 def _get_env_float(name: str, default: float) -> float:
     value = os.environ.get(name)
@@ -57,6 +104,55 @@ def _get_env_float(name: str, default: float) -> float:
         return default
 
 
+class TranslationCache:
+    """Persistent memo of translations keyed by model, language, field and source text.
+
+    Finished translations survive a crashed or interrupted run, so a restart only
+    requests the fields that never came back.
+    """
+
+    def __init__(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS translations (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+
+    @staticmethod
+    def _key(model: str, language_code: str, field_name: str, text: str) -> str:
+        raw = f"{model}|{language_code}|{field_name}|{text}".encode("utf-8")
+        return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+    def get(self, model: str, language_code: str, field_name: str, text: str) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT value FROM translations WHERE key = ?", (self._key(model, language_code, field_name, text),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def put(self, model: str, language_code: str, field_name: str, text: str, value: str) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO translations (key, value) VALUES (?, ?)",
+            (self._key(model, language_code, field_name, text), value),
+        )
+
+    def commit(self) -> None:
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.commit()
+        self._conn.close()
+
+
+async def _closing(http_client: httpx.AsyncClient, coro: Awaitable[None]) -> None:
+    try:
+        await coro
+    finally:
+        await http_client.aclose()
+
+
 def _coerce_message_content(content: object) -> str:
     if isinstance(content, str):
         return content.strip()
@@ -107,23 +203,12 @@ def extract_text_from_response_body(body: Dict[str, Any]) -> str:
 def parse_languages(values: Iterable[str]) -> List[str]:
     """Normalise target language codes while preserving order."""
 
-    seen = set()
-    result: List[str] = []
-    for value in values:
-        if not value:
-            continue
-        parts = [part.strip().lower() for part in value.replace(";", ",").split(",")]
-        expanded: List[str] = []
-        for part in parts:
-            if not part:
-                continue
-            expanded.extend(segment.strip().lower() for segment in part.split())
-        for code in expanded:
-            if not code or code in seen:
-                continue
-            seen.add(code)
-            result.append(code)
-    return result
+    codes = (code.lower() for code in _LANGUAGE_SEPARATORS_RE.split(" ".join(v for v in values if v)) if code)
+    return list(dict.fromkeys(codes))
+
+
+def is_language_agnostic(text: str) -> bool:
+    return bool(_LANGUAGE_AGNOSTIC_RE.match(text))
 
 
 def describe_language(language_code: str) -> str:
@@ -133,44 +218,170 @@ def describe_language(language_code: str) -> str:
     return f"the language indicated by the ISO 639-1 code '{language_code}'"
 
 
-def build_translation_prompt(field_name: str, text: str, language_code: str) -> str:
+# Prompts only vary by the source text once the field and language are known,
+# so the surrounding text is formatted once per combination.
+@functools.lru_cache(maxsize=None)
+def _translation_prompt_prefix(field_name: str, language_code: str) -> str:
     target_language = describe_language(language_code)
     return (
         "You are a professional bilingual translator.\n\n"
         f"Translate the following French `{field_name}` into {target_language}:\n--\n"
-        + text + "\n--\n"
+    )
+
+
+_TRANSLATION_PROMPT_SUFFIX = (
+    "\n--\n"
+    "Preserve Markdown formatting when present.\n"
+    "Return only the translated text without additional commentary.\n\n"
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _multi_field_prompt_parts(keys: Tuple[str, ...], language_code: str) -> Tuple[str, str]:
+    target_language = describe_language(language_code)
+    quoted_keys = ", ".join(f'"{key}"' for key in keys)
+    prefix = (
+        "You are a professional bilingual translator.\n\n"
+        f"Translate the values of the following French recipe JSON object into {target_language}:\n--\n"
+    )
+    suffix = (
+        "\n--\n"
         "Preserve Markdown formatting when present.\n"
-        "Return only the translated text without additional commentary.\n\n"
+        f"Return only a JSON object with the keys {quoted_keys} holding the translated values, without additional commentary.\n\n"
     )
+    return prefix, suffix
 
 
-def translate_field(client: Mistral, model: str, field_name: str, text: str, language_code: str) -> str:
-    """Translate a single field while preserving Markdown structure."""
+def build_translation_prompt(field_name: str, text: str, language_code: str) -> str:
+    return _translation_prompt_prefix(field_name, language_code) + text + _TRANSLATION_PROMPT_SUFFIX
 
-    prompt = build_translation_prompt(field_name, text, language_code)
 
-    response = client.chat.complete(
+def _dump_fields(fields: Dict[str, str]) -> str:
+    return json_dumps(fields, indent=True).decode("utf-8")
+
+
+def build_multi_field_prompt(fields: Dict[str, str], language_code: str) -> str:
+    prefix, suffix = _multi_field_prompt_parts(tuple(fields), language_code)
+    return prefix + _dump_fields(fields) + suffix
+
+
+def parse_multi_field_response(raw: str, fields: Dict[str, str]) -> Dict[str, str]:
+    """Validate a JSON-mode answer and return the translated value of every field."""
+
+    data = json_loads(raw)
+    if not isinstance(data, dict):
+        raise ValueError("Translation response is not a JSON object.")
+
+    translated: Dict[str, str] = {}
+    for key in fields:
+        value = data.get(key)
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f"Translation response is missing the '{key}' field.")
+        translated[key] = value.strip()
+    return translated
+
+
+async def _stream_completion(client: Mistral, model: str, prompt: str, **kwargs: Any) -> str:
+    """Run a streamed chat completion and return the accumulated answer."""
+
+    buffer = io.StringIO()
+    stream = await client.chat.stream_async(
         model=model,
-        messages=[{"role": "user", "content": prompt}],
+        messages=[SYSTEM_MESSAGE, {"role": "user", "content": prompt}],
+        **kwargs,
     )
+    async with stream:
+        async for event in stream:
+            for choice in event.data.choices:
+                content = choice.delta.content
+                if isinstance(content, str):
+                    buffer.write(content)
+                elif isinstance(content, list):
+                    for item in content:
+                        text = getattr(item, "text", None)
+                        if isinstance(text, str):
+                            buffer.write(text)
+    return buffer.getvalue().strip()
+
+
+async def translate_field(client: Mistral, model: str, field_name: str, text: str, language_code: str) -> str:
+    """Translate a single field while preserving Markdown structure."""
 
-    choices = getattr(response, "choices", None)
-    if not choices:
-        return ""
+    prompt = build_translation_prompt(field_name, text, language_code)
+    return await _stream_completion(client, model, prompt)
 
-    for choice in choices:
-        message = getattr(choice, "message", None)
-        if not message:
-            continue
 
-        translated = _coerce_message_content(getattr(message, "content", None))
-        if translated:
-            return translated
+async def translate_recipe_into_language(
+    client: Mistral, model: str, fields: Dict[str, str], language_code: str
+) -> Dict[str, str]:
+    """Translate all fields of a recipe into one language with a single JSON-mode call."""
 
-    return ""
+    prompt = build_multi_field_prompt(fields, language_code)
+    raw = await _stream_completion(client, model, prompt, response_format={"type": "json_object"})
+    return parse_multi_field_response(raw, fields)
 
 
-def translate_recipe(client: Mistral, model: str, recipe: Dict[str, str], languages: List[str]) -> Dict[str, str]:
+async def _translate_field_limited(
+    sem: asyncio.Semaphore, client: Mistral, model: str, field_name: str, text: str, language_code: str
+) -> str:
+    async with sem:
+        return await translate_field(client, model, field_name, text, language_code)
+
+
+async def _translate_language(
+    client: Mistral,
+    model: str,
+    fields: Dict[str, str],
+    code: str,
+    sem: asyncio.Semaphore,
+    cache: Optional[TranslationCache] = None,
+) -> Dict[str, str]:
+    cached: Dict[str, str] = {}
+    for key, source_text in fields.items():
+        if is_language_agnostic(source_text):
+            cached[key] = source_text
+        elif cache is not None:
+            hit = cache.get(model, code, key, source_text)
+            if hit is not None:
+                cached[key] = hit
+
+    missing = {key: source_text for key, source_text in fields.items() if key not in cached}
+    if not missing:
+        return cached
+
+    try:
+        async with sem:
+            values = await translate_recipe_into_language(client, model, missing, code)
+    except ValueError as exc:
+        # Malformed JSON output: fall back to one call per field.
+        print(f"   Warning: structured translation into '{code}' failed ({exc}), translating field by field…")
+        keys = list(missing)
+        results = await asyncio.gather(
+            *(_translate_field_limited(sem, client, model, FIELD_PROMPT_NAMES[key], missing[key], code) for key in keys)
+        )
+        values = dict(zip(keys, results))
+
+    if "text" in values:
+        values["text"] = strip_code_fence(values["text"])
+
+    if cache is not None:
+        for key, value in values.items():
+            if value:
+                cache.put(model, code, key, missing[key], value)
+        cache.commit()
+
+    # Cache hits and copied fields keep their place in ``fields`` (title, description, text).
+    return {key: cached[key] if key in cached else values[key] for key in fields}
+
+
+async def translate_recipe(
+    client: Mistral,
+    model: str,
+    recipe: Dict[str, str],
+    languages: List[str],
+    sem: asyncio.Semaphore,
+    cache: Optional[TranslationCache] = None,
+) -> Dict[str, str]:
     title_fr = recipe.get("title", "").strip()
     description_fr = recipe.get("description", "").strip()
     text_fr = recipe.get("text", "").strip()
@@ -184,27 +395,296 @@ def translate_recipe(client: Mistral, model: str, recipe: Dict[str, str], langua
         "text_fr": text_fr,
     }
 
-    for language_code in languages:
-        code = language_code.lower()
-        if code == "fr":
-            continue
+    fields = {
+        key: source_text
+        for key, source_text in (("title", title_fr), ("description", description_fr), ("text", text_fr))
+        if source_text
+    }
+
+    # Languages are independent, so their requests run concurrently (at most as
+    # many at once as ``sem`` allows); the first failure cancels the others.
+    codes = [code for code in (language_code.lower() for language_code in languages) if code != "fr"]
+    try:
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(_translate_language(client, model, fields, code, sem, cache)) for code in codes]
+    except ExceptionGroup as group:
+        raise group.exceptions[0]
 
-        if title_fr:
-            translated[f"title_{code}"] = translate_field(client, model, "title", title_fr, code)
-        if description_fr:
-            translated[f"description_{code}"] = translate_field(client, model, "description", description_fr, code)
-        if text_fr:
-            text = translate_field(client, model, "recipe text", text_fr, code)
-            if text.startswith("```"):
-                text = text[text.find("\n")+1:]
-            if text.strip().endswith("```"):
-                text = text[:text.rfind("\n")]
-            translated[f"text_{code}"] = text
+    for code, task in zip(codes, tasks):
+        for key, value in task.result().items():
+            translated[f"{key}_{code}"] = value
 
     return translated
 
 
-def translate_recipes_batch(
+def _is_transient(exc: SDKError) -> bool:
+    status_code = getattr(exc, "status_code", None)
+    return status_code == 429 or (isinstance(status_code, int) and status_code >= 500)
+
+
+async def _translate_entry(
+    client: Mistral,
+    model: str,
+    entry: Dict[str, Any],
+    languages: List[str],
+    total: int,
+    label: str,
+    recipe_sem: asyncio.Semaphore,
+    request_sem: asyncio.Semaphore,
+    cache: Optional[TranslationCache] = None,
+    source_keys: Optional[SourceKeys] = None,
+) -> None:
+    position = entry["position"]
+    filename = entry["filename"]
+    start = time.perf_counter()
+
+    for attempt in range(1, RETRY_ATTEMPTS + 1):
+        try:
+            async with recipe_sem:
+                if attempt == 1:
+                    print(f"[{position}/{total}] Translating: {filename}{label}")
+                recipe_data = entry.get("recipe_data") or await asyncio.to_thread(read_json, entry["recipe_path"])
+                translated = await translate_recipe(client, model, recipe_data, languages, request_sem, cache)
+                await asyncio.to_thread(write_json, entry["output_path"], translated)
+                if source_keys is not None:
+                    source_keys.record(os.path.splitext(entry["filename"])[0])
+        except SDKError as exc:
+            if _is_transient(exc) and attempt < RETRY_ATTEMPTS:
+                # Back off outside the semaphore so other recipes keep the slots busy.
+                delay = min(RETRY_MAX_DELAY, 2.0 ** attempt)
+                print(f"   API error {exc.status_code} for '{filename}', retrying in {delay:.0f}s…")
+                await asyncio.sleep(delay)
+                continue
+            elapsed = time.perf_counter() - start
+            print(f"   Error translating '{filename}' after {elapsed:.2f}s: {exc}")
+            return
+        except Exception as exc:
+            elapsed = time.perf_counter() - start
+            print(f"   Error translating '{filename}' after {elapsed:.2f}s: {exc}")
+            return
+
+        elapsed = time.perf_counter() - start
+        print(f"   Saved to {entry['output_path']} in {elapsed:.2f}s")
+        return
+
+
+async def translate_entries(
+    client: Mistral,
+    model: str,
+    entries: List[Dict[str, Any]],
+    languages: List[str],
+    total: int,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    label: str = "",
+    cache: Optional[TranslationCache] = None,
+    parallel: int = DEFAULT_PARALLEL,
+    source_keys: Optional[SourceKeys] = None,
+) -> None:
+    """Translate recipes with realtime API calls: ``concurrency`` recipes and ``parallel`` requests at a time."""
+
+    recipe_sem = asyncio.Semaphore(max(1, concurrency))
+    request_sem = asyncio.Semaphore(max(1, parallel))
+    # The task group cancels every pending recipe cleanly on Ctrl-C.
+    async with asyncio.TaskGroup() as tg:
+        for entry in entries:
+            tg.create_task(
+                _translate_entry(
+                    client, model, entry, languages, total, label, recipe_sem, request_sem, cache, source_keys
+                )
+            )
+
+
+def _parse_batch_result(payload: Dict[str, Any]) -> Tuple[Optional[str], Optional[str], bool]:
+    """Return ``(text, error, permanent)`` for one line of a batch output or error file."""
+
+    error_info = payload.get("error")
+    if error_info is not None:
+        message = error_info
+        if isinstance(error_info, dict):
+            message = error_info.get("message") or error_info
+        return None, str(message), False
+
+    response_obj = payload.get("response")
+    body: Optional[Dict[str, Any]] = None
+
+    if isinstance(response_obj, dict):
+        body = response_obj.get("body")
+        status_code = response_obj.get("status_code")
+        if isinstance(status_code, str):
+            try:
+                status_code = int(status_code)
+            except ValueError:
+                status_code = None
+        if isinstance(status_code, int) and status_code >= 400:
+            permanent = status_code < 500 and status_code != 429
+            return None, f"HTTP {status_code}", permanent
+        if isinstance(body, str):
+            try:
+                body = json_loads(body)
+            except json.JSONDecodeError:
+                body = None
+
+    if not isinstance(body, dict):
+        return None, "missing batch response", False
+
+    translated = extract_text_from_response_body(body)
+    if not translated:
+        return None, "empty batch response", False
+
+    return translated, None, False
+
+
+async def _submit_batch_chunk(client: Mistral, model: str, lines: List[bytes]) -> Any:
+    content = b"\n".join(lines) + b"\n"
+    upload = await client.files.upload_async(
+        file=File(fileName="translations.jsonl", content=content, content_type="application/jsonl"),
+        purpose="batch",
+    )
+    return await client.batch.jobs.create_async(
+        endpoint="/v1/chat/completions",
+        model=model,
+        input_files=[upload.id],
+    )
+
+
+def _parse_batch_line(raw_line: bytes) -> Optional[Dict[str, Any]]:
+    if not raw_line.strip():
+        return None
+    try:
+        payload = json_loads(raw_line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        print(f"   Warning: unable to parse batch line: {raw_line[:80].decode('utf-8', errors='ignore')}…")
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+async def _iter_batch_lines(client: Mistral, file_id: str) -> AsyncIterator[Dict[str, Any]]:
+    """Yield the parsed lines of a batch file while it downloads, one line in memory at a time."""
+
+    response = await client.files.download_async(file_id=file_id)
+    buffer = b""
+    try:
+        async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for raw_line in lines:
+                payload = _parse_batch_line(raw_line)
+                if payload is not None:
+                    yield payload
+    finally:
+        await response.aclose()
+
+    payload = _parse_batch_line(buffer)
+    if payload is not None:
+        yield payload
+
+
+async def _wait_for_batch_jobs(
+    client: Mistral,
+    jobs: Dict[str, Any],
+    created_after: datetime,
+    poll_interval: float,
+    deadline: Optional[float],
+) -> Dict[str, Any]:
+    """Poll all ``jobs`` with one list call per tick and return the ones that finished.
+
+    The delay between ticks grows by ``BATCH_POLL_BACKOFF`` while nothing changes
+    (up to ``BATCH_POLL_MAX_INTERVAL``) and resets to ``poll_interval`` on progress.
+    """
+
+    running = {job_id: job for job_id, job in jobs.items() if job.status in BATCH_ACTIVE_STATUSES}
+    finished = {job_id: job for job_id, job in jobs.items() if job_id not in running}
+    initial_interval = poll_interval if poll_interval > 0 else 1.0
+    interval = initial_interval
+
+    while running:
+        if deadline and time.perf_counter() >= deadline:
+            print("   Batch wait timeout reached, leaving remaining recipes for fallback.")
+            break
+        await asyncio.sleep(interval)
+
+        listing = await client.batch.jobs.list_async(
+            created_after=created_after, page_size=max(100, len(jobs))
+        )
+        updates = {job.id: job for job in listing.data or [] if job.id in running}
+        for job_id in running.keys() - updates.keys():
+            # Not on the first page (e.g. other jobs were created meanwhile): ask directly.
+            updates[job_id] = await client.batch.jobs.get_async(job_id=job_id)
+
+        progressed = any(
+            (job.status, job.completed_requests) != (running[job_id].status, running[job_id].completed_requests)
+            for job_id, job in updates.items()
+        )
+        interval = initial_interval if progressed else min(BATCH_POLL_MAX_INTERVAL, interval * BATCH_POLL_BACKOFF)
+
+        for job_id, job in updates.items():
+            if job.status in BATCH_ACTIVE_STATUSES:
+                running[job_id] = job
+            else:
+                del running[job_id]
+                finished[job_id] = job
+
+        current = [*running.values(), *finished.values()]
+        completed = sum(job.completed_requests or 0 for job in current)
+        requested = sum(job.total_requests or 0 for job in current)
+        print(f"   Status: {len(finished)}/{len(jobs)} jobs finished ({completed}/{requested} completed)")
+
+    return finished
+
+
+async def _run_batch_round(
+    client: Mistral,
+    model: str,
+    request_lines: Dict[str, bytes],
+    custom_ids: List[str],
+    poll_interval: float,
+    deadline: Optional[float],
+) -> Dict[str, Dict[str, Any]]:
+    """Submit ``custom_ids`` as concurrent batch jobs and return their result lines by custom id."""
+
+    chunks = [
+        custom_ids[start : start + BATCH_CHUNK_SIZE] for start in range(0, len(custom_ids), BATCH_CHUNK_SIZE)
+    ]
+    created_after = datetime.now(timezone.utc) - timedelta(minutes=1)
+    submitted = await asyncio.gather(
+        *(_submit_batch_chunk(client, model, [request_lines[cid] for cid in chunk]) for chunk in chunks),
+        return_exceptions=True,
+    )
+
+    jobs: Dict[str, Any] = {}
+    chunk_ids: Dict[str, List[str]] = {}
+    for chunk, job in zip(chunks, submitted):
+        if isinstance(job, BaseException):
+            print(f"   Failed to submit batch of {len(chunk)} requests: {job}")
+            continue
+        jobs[job.id] = job
+        chunk_ids[job.id] = chunk
+
+    if not jobs:
+        return {}
+
+    print(f"Created {len(jobs)} batch jobs for {len(custom_ids)} translation requests.")
+    finished = await _wait_for_batch_jobs(client, jobs, created_after, poll_interval, deadline)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for job_id, job in finished.items():
+        if job.status != "SUCCESS":
+            print(f"Batch job {job_id} finished with status {job.status}.")
+        expected = set(chunk_ids[job_id])
+        for file_id in (job.output_file, job.error_file):
+            if not file_id:
+                continue
+            try:
+                async for payload in _iter_batch_lines(client, file_id):
+                    custom_id = payload.get("custom_id")
+                    if custom_id in expected:
+                        results[custom_id] = payload
+            except Exception as exc:
+                print(f"   Failed to download batch file {file_id}: {exc}")
+    return results
+
+
+async def translate_recipes_batch(
     client: Mistral,
     model: str,
     entries: List[Dict[str, Any]],
@@ -212,13 +692,26 @@ def translate_recipes_batch(
     total: int,
     poll_interval: float,
     timeout_minutes: float,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    cache: Optional[TranslationCache] = None,
+    parallel: int = DEFAULT_PARALLEL,
+    source_keys: Optional[SourceKeys] = None,
 ) -> None:
+    """Translate recipes with the batch API, re-batching transient failures.
+
+    Requests are split into jobs of at most ``BATCH_CHUNK_SIZE`` lines that are
+    submitted concurrently. Unfulfilled requests (rate limits, server errors,
+    missing lines) are resubmitted as a new batch for up to ``BATCH_MAX_ROUNDS``
+    rounds; only permanent per-request errors, timeouts and leftovers go to the
+    realtime fallback.
+    """
+
     if not entries:
         print("Batch mode: nothing to translate.")
         return
 
     prepared_entries: List[Dict[str, Any]] = []
-    request_lines: List[str] = []
+    request_lines: Dict[str, bytes] = {}
     tasks: Dict[str, Dict[str, Any]] = {}
 
     for entry in entries:
@@ -229,8 +722,7 @@ def translate_recipes_batch(
         entry["start_time"] = time.perf_counter()
 
         try:
-            with open(entry["recipe_path"], "r", encoding="utf-8") as f:
-                recipe_data = json.load(f)
+            recipe_data = await asyncio.to_thread(read_json, entry["recipe_path"])
         except Exception as exc:
             elapsed = time.perf_counter() - entry["start_time"]
             print(f"   Error preparing '{filename}' for batch after {elapsed:.2f}s: {exc}")
@@ -257,261 +749,171 @@ def translate_recipes_batch(
         entry["needs_fallback"] = False
         prepared_entries.append(entry)
 
-        fields: List[Tuple[str, str, str]] = [
-            ("title", "title", title_fr),
-            ("description", "description", description_fr),
-            ("text", "recipe text", text_fr),
-        ]
+        fields = {
+            key: source_text
+            for key, source_text in (("title", title_fr), ("description", description_fr), ("text", text_fr))
+            if source_text
+        }
 
         for language_code in languages:
             code = language_code.lower()
             if code == "fr":
                 continue
 
-            for key_prefix, prompt_name, source_text in fields:
-                if not source_text:
+            missing: Dict[str, str] = {}
+            for key, source_text in fields.items():
+                if is_language_agnostic(source_text):
+                    entry["translations"][f"{key}_{code}"] = source_text
                     continue
+                hit = cache.get(model, code, key, source_text) if cache is not None else None
+                if hit is not None:
+                    entry["translations"][f"{key}_{code}"] = hit
+                else:
+                    missing[key] = source_text
 
-                result_key = f"{key_prefix}_{code}"
-                entry["pending_keys"].add(result_key)
-                custom_id = f"{position}|{result_key}"
-                prompt = build_translation_prompt(prompt_name, source_text, code)
-                body = {
-                    "model": model,
-                    "messages": [{"role": "user", "content": prompt}],
-                }
+            if not missing:
+                continue
 
-                request_lines.append(
-                    json.dumps(
-                        {
-                            "custom_id": custom_id,
-                            "method": "POST",
-                            "url": "/v1/chat/completions",
-                            "body": body,
-                        },
-                        ensure_ascii=False,
-                    )
-                )
+            entry["pending_keys"].update(f"{key}_{code}" for key in missing)
+
+            # One JSON-mode request per recipe and language; identical requests are
+            # submitted once and their result is fanned out to every recipe.
+            digest = hashlib.blake2b(json_dumps(missing), digest_size=16).hexdigest()
+            custom_id = f"{code}|{digest}"
+            task = tasks.get(custom_id)
+            if task is not None:
+                task["targets"].append(entry)
+                continue
+
+            # Same as build_multi_field_prompt, inlined for this hot loop.
+            prefix, suffix = _multi_field_prompt_parts(tuple(missing), code)
+            body = {
+                "model": model,
+                "messages": [SYSTEM_MESSAGE, {"role": "user", "content": prefix + _dump_fields(missing) + suffix}],
+                "response_format": {"type": "json_object"},
+            }
 
-                tasks[custom_id] = {
-                    "entry": entry,
-                    "result_key": result_key,
+            request_lines[custom_id] = json_dumps(
+                {
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": body,
                 }
+            )
 
-    if not prepared_entries:
-        return
+            tasks[custom_id] = {
+                "targets": [entry],
+                "code": code,
+                "fields": missing,
+            }
 
-    if not request_lines:
-        for entry in prepared_entries:
-            elapsed = time.perf_counter() - entry["start_time"]
-            try:
-                with open(entry["output_path"], "w", encoding="utf-8") as f:
-                    json.dump(entry["translations"], f, ensure_ascii=False, indent=2)
-                print(f"   Saved to {entry['output_path']} in {elapsed:.2f}s")
-            except Exception as exc:
-                print(f"   Error writing '{entry['filename']}': {exc}")
+    if not prepared_entries:
         return
 
-    with tempfile.NamedTemporaryFile("w", encoding="utf-8", suffix=".jsonl", delete=False) as tmp_file:
-        tmp_file.write("\n".join(request_lines) + "\n")
-        batch_path = tmp_file.name
+    deadline: Optional[float] = None
+    if timeout_minutes > 0:
+        deadline = time.perf_counter() + timeout_minutes * 60
 
-    processed_ids: set[str] = set()
+    pending_ids = list(request_lines)
+    rounds = 0
 
     try:
-        with open(batch_path, "rb") as fh:
-            upload = client.files.upload(
-                file=File(
-                    fileName=os.path.basename(batch_path),
-                    content=fh,
-                    content_type="application/jsonl",
-                ),
-                purpose="batch",
-            )
-
-        job = client.batch.jobs.create(
-            endpoint="/v1/chat/completions",
-            model=model,
-            input_files=[upload.id],
-        )
-        print(
-            f"Created batch job {job.id} for {len(request_lines)} translation requests (status: {job.status})."
-        )
-
-        deadline: Optional[float] = None
-        if timeout_minutes > 0:
-            deadline = time.perf_counter() + timeout_minutes * 60
-
-        interval = poll_interval if poll_interval > 0 else 5.0
-
-        while job.status in ("QUEUED", "RUNNING"):
+        while pending_ids and rounds < BATCH_MAX_ROUNDS:
             if deadline and time.perf_counter() >= deadline:
-                print("   Batch wait timeout reached, leaving remaining recipes for fallback.")
                 break
-            time.sleep(interval)
-            job = client.batch.jobs.get(job_id=job.id)
-            print(
-                f"   Status: {job.status} ({job.completed_requests}/{job.total_requests} completed)"
-            )
-
-        if job.status != "SUCCESS" or not job.output_file:
-            print(f"Batch job {job.id} finished with status {job.status}.")
-            if job.error_file:
-                try:
-                    error_response = client.files.download(file_id=job.error_file)
-                    error_text = error_response.read().decode("utf-8", errors="ignore")
-                    for line in error_text.splitlines():
-                        if line.strip():
-                            print(f"   Error detail: {line}")
-                except Exception as error_exc:
-                    print(f"   Failed to download error file: {error_exc}")
-
-            for entry in prepared_entries:
-                entry["needs_fallback"] = True
-        else:
-            output_response = client.files.download(file_id=job.output_file)
-            output_text = output_response.read().decode("utf-8", errors="ignore")
+            if rounds:
+                print(f"Resubmitting {len(pending_ids)} unfulfilled translation requests as a new batch…")
+            rounds += 1
 
-            for raw_line in output_text.splitlines():
-                if not raw_line.strip():
-                    continue
-
-                try:
-                    payload = json.loads(raw_line)
-                except json.JSONDecodeError:
-                    print(f"   Warning: unable to parse batch line: {raw_line[:80]}…")
-                    continue
+            results = await _run_batch_round(client, model, request_lines, pending_ids, poll_interval, deadline)
 
-                custom_id = payload.get("custom_id")
-                if not isinstance(custom_id, str):
+            unfulfilled: List[str] = []
+            for custom_id in pending_ids:
+                payload = results.get(custom_id)
+                if payload is None:
+                    unfulfilled.append(custom_id)
                     continue
 
-                processed_ids.add(custom_id)
-                task = tasks.get(custom_id)
-                if not task:
+                task = tasks[custom_id]
+                code = task["code"]
+                raw, error, permanent = _parse_batch_result(payload)
+
+                values: Optional[Dict[str, str]] = None
+                if raw is not None:
+                    try:
+                        values = parse_multi_field_response(raw, task["fields"])
+                    except ValueError as exc:
+                        # The realtime path retries malformed JSON field by field.
+                        error, permanent = str(exc), True
+
+                if values is None:
+                    for entry in task["targets"]:
+                        print(f"   Batch error for '{entry['filename']}' ({code}): {error}")
+                        if permanent:
+                            entry["needs_fallback"] = True
+                    if not permanent:
+                        unfulfilled.append(custom_id)
                     continue
 
-                entry = task["entry"]
-                result_key = task["result_key"]
-
-                error_info = payload.get("error")
-                if error_info is not None:
-                    message = error_info
-                    if isinstance(error_info, dict):
-                        message = error_info.get("message") or error_info
-                    print(
-                        f"   Batch error for '{entry['filename']}' ({result_key}): {message}"
-                    )
-                    entry["needs_fallback"] = True
-                    continue
-
-                response_obj = payload.get("response")
-                body: Optional[Dict[str, Any]] = None
-                status_code: Optional[int] = None
-
-                if isinstance(response_obj, dict):
-                    body = response_obj.get("body")
-                    status_code = response_obj.get("status_code")
-                    if isinstance(status_code, str):
-                        try:
-                            status_code = int(status_code)
-                        except ValueError:
-                            status_code = None
-                    if isinstance(status_code, int) and status_code >= 400:
-                        print(
-                            f"   Batch HTTP {status_code} for '{entry['filename']}' ({result_key}), falling back to realtime call."
-                        )
-                        entry["needs_fallback"] = True
-                        continue
-                    if isinstance(body, str):
-                        try:
-                            body = json.loads(body)
-                        except json.JSONDecodeError:
-                            body = None
-
-                if not isinstance(body, dict):
-                    print(
-                        f"   Missing batch response for '{entry['filename']}' ({result_key}), falling back."
-                    )
-                    entry["needs_fallback"] = True
-                    continue
-
-                translated = extract_text_from_response_body(body)
-                if not translated:
-                    print(
-                        f"   Empty batch response for '{entry['filename']}' ({result_key}), falling back."
-                    )
-                    entry["needs_fallback"] = True
-                    continue
-
-                if result_key.startswith("text_"):
-                    if translated.startswith("```"):
-                        translated = translated[translated.find("\n") + 1 :]
-                    if translated.strip().endswith("```"):
-                        translated = translated[: translated.rfind("\n")]
-
-                entry["translations"][result_key] = translated
-                entry["pending_keys"].discard(result_key)
-
-        for custom_id, task in tasks.items():
-            if custom_id not in processed_ids:
-                task["entry"]["needs_fallback"] = True
+                if "text" in values:
+                    values["text"] = strip_code_fence(values["text"])
 
-        for entry in prepared_entries:
-            if entry["pending_keys"]:
-                entry["needs_fallback"] = True
+                for entry in task["targets"]:
+                    for key, value in values.items():
+                        entry["translations"][f"{key}_{code}"] = value
+                        entry["pending_keys"].discard(f"{key}_{code}")
+                if cache is not None:
+                    for key, value in values.items():
+                        cache.put(model, code, key, task["fields"][key], value)
 
-        for entry in prepared_entries:
-            if entry["needs_fallback"]:
-                continue
+            # Persist each round as soon as it is parsed so a crash does not lose it.
+            if cache is not None:
+                cache.commit()
 
-            elapsed = time.perf_counter() - entry["start_time"]
-            try:
-                with open(entry["output_path"], "w", encoding="utf-8") as f:
-                    json.dump(entry["translations"], f, ensure_ascii=False, indent=2)
-                print(f"   Saved to {entry['output_path']} in {elapsed:.2f}s")
-            except Exception as exc:
-                print(f"   Error writing '{entry['filename']}': {exc}")
+            pending_ids = unfulfilled
 
     except KeyboardInterrupt:
         print("Interrupted by user. Exiting…")
         sys.exit(1)
     except Exception as exc:
         print(f"Batch translation failed: {exc}")
-        for entry in prepared_entries:
+
+    for entry in prepared_entries:
+        if entry["pending_keys"]:
             entry["needs_fallback"] = True
-    finally:
+
+    for entry in prepared_entries:
+        if entry["needs_fallback"]:
+            continue
+
+        elapsed = time.perf_counter() - entry["start_time"]
         try:
-            os.remove(batch_path)
-        except OSError:
-            pass
+            await asyncio.to_thread(write_json, entry["output_path"], entry["translations"])
+            if source_keys is not None:
+                source_keys.record(os.path.splitext(entry["filename"])[0])
+            print(f"   Saved to {entry['output_path']} in {elapsed:.2f}s")
+        except Exception as exc:
+            print(f"   Error writing '{entry['filename']}': {exc}")
 
     fallback_entries = [entry for entry in prepared_entries if entry.get("needs_fallback")]
     if not fallback_entries:
         return
 
     print(f"Falling back to realtime translation for {len(fallback_entries)} recipes…")
+    await translate_entries(
+        client,
+        model,
+        fallback_entries,
+        languages,
+        total,
+        concurrency,
+        label=" (fallback)",
+        cache=cache,
+        parallel=parallel,
+        source_keys=source_keys,
+    )
 
-    for entry in fallback_entries:
-        position = entry["position"]
-        filename = entry["filename"]
-        print(f"[{position}/{total}] Translating: {filename} (fallback)")
-        start = time.perf_counter()
-        try:
-            translated = translate_recipe(client, model, entry["recipe_data"], languages)
-            with open(entry["output_path"], "w", encoding="utf-8") as f:
-                json.dump(translated, f, ensure_ascii=False, indent=2)
-            elapsed = time.perf_counter() - start
-            print(f"   Saved to {entry['output_path']} in {elapsed:.2f}s")
-        except KeyboardInterrupt:
-            print("Interrupted by user. Exiting…")
-            sys.exit(1)
-        except Exception as exc:
-            elapsed = time.perf_counter() - start
-            print(f"   Error translating '{filename}' after {elapsed:.2f}s: {exc}")
-            continue
-
-        time.sleep(0.1)
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Translate recipe JSON files into multiple languages.")
@@ -529,8 +931,8 @@ def main() -> None:
     parser.add_argument(
         "--batch-poll-interval",
         type=float,
-        default=_get_env_float(BATCH_POLL_INTERVAL_ENV, 5.0),
-        help="Seconds between batch status checks.",
+        default=_get_env_float(BATCH_POLL_INTERVAL_ENV, 1.0),
+        help="Initial seconds between batch status checks; backs off while a job makes no progress.",
     )
     parser.add_argument(
         "--batch-timeout-minutes",
@@ -538,6 +940,28 @@ def main() -> None:
         default=_get_env_float(BATCH_TIMEOUT_MINUTES_ENV, 30.0),
         help="Maximum minutes to wait for a batch job before falling back (0 to disable).",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="Maximum number of recipes translated concurrently with realtime calls.",
+    )
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=int(os.environ.get(PARALLEL_ENV) or DEFAULT_PARALLEL),
+        help="Maximum concurrent realtime requests to the Mistral API, across all recipes and languages.",
+    )
+    parser.add_argument(
+        "--cache-path",
+        default=os.environ.get(CACHE_PATH_ENV, DEFAULT_CACHE_PATH),
+        help="SQLite file memoizing translations of identical texts across recipes.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Disable the translation cache.",
+    )
 
     args = parser.parse_args()
 
@@ -551,7 +975,12 @@ def main() -> None:
         print(f"Error: set the {API_KEY_ENV} environment variable with your Mistral API key.")
         sys.exit(1)
 
-    client = Mistral(api_key=api_key)
+    async_http_client = build_async_http_client(HTTP_POOL_SIZE)
+    client = Mistral(
+        api_key=api_key,
+        client=build_http_client(HTTP_POOL_SIZE),
+        async_client=async_http_client,
+    )
 
     languages: List[str] = []
     if args.languages:
@@ -570,11 +999,21 @@ def main() -> None:
 
     print("Target languages:", ", ".join(languages))
 
-    recipe_files = [
-        os.path.join(source_dir, name)
-        for name in sorted(os.listdir(source_dir))
-        if name.endswith(".json")
-    ]
+    # One directory read per folder instead of a stat per recipe.
+    with os.scandir(source_dir) as it:
+        recipe_files = sorted(
+            (entry for entry in it if entry.name.endswith(".json") and entry.is_file()),
+            key=lambda entry: entry.name,
+        )
+    with os.scandir(output_dir) as it:
+        existing = {entry.name for entry in it}
+
+    # Translations of recipes regenerated since they were made are redone.
+    source_keys = SourceKeys(output_dir, source_dir)
+    stale = source_keys.stale(name[: -len(".json")] for name in existing if name.endswith(".json"))
+    if stale:
+        print(f"Re-translating {len(stale)} recipes regenerated since their translation.")
+        existing -= {f"{rid}.json" for rid in stale}
 
     total = len(recipe_files)
     if total == 0:
@@ -582,11 +1021,11 @@ def main() -> None:
         return
 
     entries: List[Dict[str, Any]] = []
-    for position, recipe_path in enumerate(recipe_files, start=1):
-        filename = os.path.basename(recipe_path)
+    for position, recipe_file in enumerate(recipe_files, start=1):
+        filename = recipe_file.name
         output_path = os.path.join(output_dir, filename)
 
-        if os.path.exists(output_path):
+        if filename in existing:
             print(f"[{position}/{total}] Skipping (exists): {filename}")
             continue
 
@@ -594,50 +1033,53 @@ def main() -> None:
             {
                 "position": position,
                 "filename": filename,
-                "recipe_path": recipe_path,
+                "recipe_path": recipe_file.path,
                 "output_path": output_path,
+                "size": recipe_file.stat().st_size,
             }
         )
 
-    if args.batch:
-        translate_recipes_batch(
-            client=client,
-            model=model,
-            entries=entries,
-            languages=languages,
-            total=total,
-            poll_interval=args.batch_poll_interval,
-            timeout_minutes=args.batch_timeout_minutes,
-        )
-        print("Done.")
-        return
-
-    for entry in entries:
-        position = entry["position"]
-        filename = entry["filename"]
-        print(f"[{position}/{total}] Translating: {filename}")
-        start = time.perf_counter()
-
-        try:
-            with open(entry["recipe_path"], "r", encoding="utf-8") as f:
-                recipe_data = json.load(f)
-
-            translated = translate_recipe(client, model, recipe_data, languages)
+    # Longest recipes first, so their slow requests overlap with the short ones
+    # instead of forming a tail at the end of the run.
+    entries.sort(key=lambda entry: entry["size"], reverse=True)
 
-            with open(entry["output_path"], "w", encoding="utf-8") as f:
-                json.dump(translated, f, ensure_ascii=False, indent=2)
+    cache = None if args.no_cache else TranslationCache(args.cache_path)
 
-            elapsed = time.perf_counter() - start
-            print(f"   Saved to {entry['output_path']} in {elapsed:.2f}s")
-        except KeyboardInterrupt:
-            print("Interrupted by user. Exiting…")
-            sys.exit(1)
-        except Exception as exc:
-            elapsed = time.perf_counter() - start
-            print(f"   Error translating '{filename}' after {elapsed:.2f}s: {exc}")
-            continue
-
-        time.sleep(0.1)
+    try:
+        if args.batch:
+            run = translate_recipes_batch(
+                client=client,
+                model=model,
+                entries=entries,
+                languages=languages,
+                total=total,
+                poll_interval=args.batch_poll_interval,
+                timeout_minutes=args.batch_timeout_minutes,
+                concurrency=args.concurrency,
+                cache=cache,
+                parallel=args.parallel,
+                source_keys=source_keys,
+            )
+        else:
+            run = translate_entries(
+                client,
+                model,
+                entries,
+                languages,
+                total,
+                args.concurrency,
+                cache=cache,
+                parallel=args.parallel,
+                source_keys=source_keys,
+            )
+        asyncio.run(_closing(async_http_client, run))
+    except KeyboardInterrupt:
+        print("Interrupted by user. Exiting…")
+        sys.exit(1)
+    finally:
+        if cache is not None:
+            cache.close()
+        fsync_dir(output_dir)
 
     print("Done.")
 
@@ -1,9 +1,12 @@
 import argparse
-import json
+import asyncio
+import collections
+import functools
 import os
+import re
 import sys
 import time
-from typing import Dict, Iterable, List
+from typing import AbstractSet, Dict, Iterable, List, Optional, Tuple
 
 try:
     import ollama
@@ -19,10 +22,28 @@ except Exception:
     print("Install with: pip install tiktoken")
     raise
 
+from recipe_outputs import SourceKeys
+from script_helpers import fsync_dir, json_dumps, json_loads, probe_chat_async, read_json, write_json
+
 
 TRANSLATOR_LLM = "qwen2.5"
 TOKENIZER = "cl100k_base"
 DEFAULT_TARGET_LANGUAGES = []
+# A few fixed context sizes let Ollama reuse its KV cache allocation across requests;
+# the largest one is the cap. Every request reserves RESERVED_OUTPUT_TOKENS for the
+# answer, so the smallest bucket must be larger than that to ever be chosen.
+CTX_BUCKETS = (2048, 4096, 8192)
+RESERVED_OUTPUT_TOKENS = 1024
+NUM_PARALLEL_ENV = "OLLAMA_NUM_PARALLEL"
+DEFAULT_PARALLEL = 4
+CONCURRENCY_ENV = "OLLAMA_CONCURRENCY"
+DEFAULT_CONCURRENCY = 8
+
+FIELD_PROMPT_NAMES = {
+    "title": "title",
+    "description": "description",
+    "text": "recipe text",
+}
 
 
 LANGUAGE_NAMES = {
@@ -49,29 +70,36 @@ LANGUAGE_NAMES = {
     "zh": "Chinese",
 }
 
-tokenizer = tiktoken.get_encoding(TOKENIZER)
+SYSTEM_MESSAGE = {"role": "system", "content": "Never wrap your answer in Markdown code fences."}
+
+_LANGUAGE_SEPARATORS_RE = re.compile(r"[,;\s]+")
+# Texts made only of digits, punctuation and whitespace read the same in every language.
+_LANGUAGE_AGNOSTIC_RE = re.compile(r"^[\W\d_\s]*$")
+
+# Whether the server answers the chat API; probed once at startup.
+_USE_CHAT: Optional[bool] = None
+
+# Print the context bucket picked for every request (--debug).
+_DEBUG = False
+# Requests per num_ctx bucket, summarised at the end of a --debug run.
+_CTX_BUCKET_HITS: "collections.Counter[int]" = collections.Counter()
+
+
+@functools.lru_cache(maxsize=4)
+def _get_encoder(name: str = TOKENIZER) -> "tiktoken.Encoding":
+    """Load a tiktoken encoding once; building one parses its whole BPE table."""
+    return tiktoken.get_encoding(name)
 
 
 def parse_languages(values: Iterable[str]) -> List[str]:
     """Normalise target language codes while preserving order."""
 
-    seen = set()
-    result: List[str] = []
-    for value in values:
-        if not value:
-            continue
-        parts = [part.strip().lower() for part in value.replace(";", ",").split(",")]
-        expanded: List[str] = []
-        for part in parts:
-            if not part:
-                continue
-            expanded.extend(segment.strip().lower() for segment in part.split())
-        for code in expanded:
-            if not code or code in seen:
-                continue
-            seen.add(code)
-            result.append(code)
-    return result
+    codes = (code.lower() for code in _LANGUAGE_SEPARATORS_RE.split(" ".join(v for v in values if v)) if code)
+    return list(dict.fromkeys(codes))
+
+
+def is_language_agnostic(text: str) -> bool:
+    return bool(_LANGUAGE_AGNOSTIC_RE.match(text))
 
 
 def describe_language(language_code: str) -> str:
@@ -81,39 +109,182 @@ def describe_language(language_code: str) -> str:
     return f"the language indicated by the ISO 639-1 code '{language_code}'"
 
 
-def translate_field(model: str, field_name: str, text: str, language_code: str) -> str:
-    """Translate a single field while preserving Markdown structure."""
+@functools.lru_cache(maxsize=None)
+def build_prompt_parts(field_name: str, language_code: str) -> Tuple[str, str]:
+    """Return the fixed text surrounding the source text in a translation prompt."""
 
     target_language = describe_language(language_code)
-    prompt = (
+    prefix = (
         "You are a professional bilingual translator.\n\n"
         f"Translate the following French `{field_name}` into {target_language}:\n--\n"
-        + text + "\n--\n"
+    )
+    suffix = (
+        "\n--\n"
         "Preserve Markdown formatting when present.\n"
         "Return only the translated text without additional commentary.\n\n"
     )
+    return prefix, suffix
 
-    ntokens = len(tokenizer.encode(prompt))
-    num_ctx = 1 << (ntokens - 1).bit_length()
 
-    try:
-        response = ollama.chat(
+@functools.lru_cache(maxsize=None)
+def build_multi_field_prompt_parts(keys: Tuple[str, ...], language_code: str) -> Tuple[str, str]:
+    """Return the fixed text surrounding the JSON object of a multi-field prompt."""
+
+    target_language = describe_language(language_code)
+    quoted_keys = ", ".join(f'"{key}"' for key in keys)
+    prefix = (
+        "You are a professional bilingual translator.\n\n"
+        f"Translate the values of the following French recipe JSON object into {target_language}:\n--\n"
+    )
+    suffix = (
+        "\n--\n"
+        "Preserve Markdown formatting when present.\n"
+        f"Return only a JSON object with the keys {quoted_keys} holding the translated values, without additional commentary.\n\n"
+    )
+    return prefix, suffix
+
+
+@functools.lru_cache(maxsize=None)
+def _prompt_overhead_tokens(field_name: str, language_code: str) -> int:
+    prefix, suffix = build_prompt_parts(field_name, language_code)
+    encoder = _get_encoder()
+    return len(encoder.encode(prefix)) + len(encoder.encode(suffix))
+
+
+@functools.lru_cache(maxsize=None)
+def _multi_field_overhead_tokens(keys: Tuple[str, ...], language_code: str) -> int:
+    prefix, suffix = build_multi_field_prompt_parts(keys, language_code)
+    encoder = _get_encoder()
+    return len(encoder.encode(prefix)) + len(encoder.encode(suffix))
+
+
+def context_size(prompt_tokens: int, output_tokens: int = RESERVED_OUTPUT_TOKENS) -> int:
+    """Smallest context bucket holding the prompt plus room for the answer."""
+
+    needed = prompt_tokens + output_tokens
+    return next((size for size in CTX_BUCKETS if size >= needed), CTX_BUCKETS[-1])
+
+
+class ContextOverflowError(ValueError):
+    """A prompt plus its reserved answer does not fit in the largest context bucket."""
+
+
+def _generation_options(prompt_tokens: int, text_tokens: int) -> Dict[str, int]:
+    # A translation can run longer than its source, so long texts reserve twice their size.
+    reserve = max(RESERVED_OUTPUT_TOKENS, 2 * text_tokens)
+    if prompt_tokens + reserve > CTX_BUCKETS[-1]:
+        # Ollama would silently drop the start of the prompt and cut the answer short.
+        print(
+            f"   Warning: {prompt_tokens} prompt tokens plus {reserve} reserved for the answer "
+            f"exceed the largest context ({CTX_BUCKETS[-1]})."
+        )
+        raise ContextOverflowError(f"prompt of {prompt_tokens} tokens does not fit in num_ctx={CTX_BUCKETS[-1]}")
+    num_ctx = context_size(prompt_tokens, reserve)
+    _CTX_BUCKET_HITS[num_ctx] += 1
+    if _DEBUG:
+        print(f"   [debug] num_ctx={num_ctx} for {prompt_tokens} prompt tokens ({text_tokens} source)")
+    return {"num_ctx": num_ctx, "num_predict": max(RESERVED_OUTPUT_TOKENS, num_ctx - prompt_tokens)}
+
+
+async def translate_field(
+    client: ollama.AsyncClient, model: str, field_name: str, text: str, language_code: str
+) -> str:
+    """Translate a single field while preserving Markdown structure."""
+
+    prefix, suffix = build_prompt_parts(field_name, language_code)
+    prompt = prefix + text + suffix
+
+    # Only the recipe text varies between calls; the boilerplate count is cached.
+    text_tokens = len(_get_encoder().encode(text))
+    options = _generation_options(_prompt_overhead_tokens(field_name, language_code) + text_tokens, text_tokens)
+
+    if _USE_CHAT is not False:
+        response = await client.chat(
             model=model,
-            messages=[{"role": "user", "content": prompt}],
-            num_ctx=num_ctx,
+            messages=[SYSTEM_MESSAGE, {"role": "user", "content": prompt}],
+            options=options,
         )
         translated = response.get("message", {}).get("content", "").strip()
         if translated:
             return translated
-    except Exception:
-        pass
 
-    # Fallback to the generate API if chat isn't available
-    response = ollama.generate(model=model, prompt=prompt)
+    # Fallback to the generate API if chat isn't available or came back empty
+    response = await client.generate(model=model, prompt=prompt, options=options)
     return response.get("response", "").strip()
 
 
-def translate_recipe(model: str, recipe: Dict[str, str], languages: List[str]) -> Dict[str, str]:
+async def translate_recipe_into_language(
+    client: ollama.AsyncClient, model: str, fields: Dict[str, str], language_code: str
+) -> Dict[str, str]:
+    """Translate all fields of a recipe into one language with a single JSON-mode call."""
+
+    keys = tuple(fields)
+    prefix, suffix = build_multi_field_prompt_parts(keys, language_code)
+    payload = json_dumps(fields, indent=True).decode("utf-8")
+
+    payload_tokens = len(_get_encoder().encode(payload))
+    options = _generation_options(_multi_field_overhead_tokens(keys, language_code) + payload_tokens, payload_tokens)
+
+    response = await client.chat(
+        model=model,
+        messages=[SYSTEM_MESSAGE, {"role": "user", "content": prefix + payload + suffix}],
+        format="json",
+        options=options,
+    )
+
+    data = json_loads(response.get("message", {}).get("content", ""))
+    if not isinstance(data, dict):
+        raise ValueError("Translation response is not a JSON object.")
+
+    translated: Dict[str, str] = {}
+    for key in keys:
+        value = data.get(key)
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f"Translation response is missing the '{key}' field.")
+        translated[key] = value.strip()
+    return translated
+
+
+async def _translate_field_limited(
+    sem: asyncio.Semaphore, client: ollama.AsyncClient, model: str, field_name: str, text: str, language_code: str
+) -> str:
+    async with sem:
+        return await translate_field(client, model, field_name, text, language_code)
+
+
+async def _translate_language(
+    client: ollama.AsyncClient,
+    model: str,
+    fields: Dict[str, str],
+    code: str,
+    sem: asyncio.Semaphore,
+    per_field: bool,
+) -> Dict[str, str]:
+    if not per_field and _USE_CHAT is not False:
+        try:
+            async with sem:
+                return await translate_recipe_into_language(client, model, fields, code)
+        except (ValueError, KeyError) as exc:
+            # Malformed or incomplete JSON, or all fields together too long for the
+            # context: fall back to one call per field. Transport and server errors
+            # propagate, since per-field calls would fail the same way.
+            print(f"   Warning: structured translation into '{code}' failed ({exc}), translating field by field…")
+
+    keys = list(fields)
+    results = await asyncio.gather(
+        *(_translate_field_limited(sem, client, model, FIELD_PROMPT_NAMES[key], fields[key], code) for key in keys)
+    )
+    return dict(zip(keys, results))
+
+
+async def translate_recipe(
+    client: ollama.AsyncClient,
+    model: str,
+    recipe: Dict[str, str],
+    languages: List[str],
+    sem: asyncio.Semaphore,
+    per_field: bool = False,
+) -> Dict[str, str]:
     title_fr = recipe.get("title", "").strip()
     description_fr = recipe.get("description", "").strip()
     text_fr = recipe.get("text", "").strip()
@@ -127,21 +298,120 @@ def translate_recipe(model: str, recipe: Dict[str, str], languages: List[str]) -
         "text_fr": text_fr,
     }
 
-    for language_code in languages:
-        code = language_code.lower()
-        if code == "fr":
-            continue
-
-        if title_fr:
-            translated[f"title_{code}"] = translate_field(model, "title", title_fr, code)
-        if description_fr:
-            translated[f"description_{code}"] = translate_field(model, "description", description_fr, code)
-        if text_fr:
-            translated[f"text_{code}"] = translate_field(model, "recipe text", text_fr, code)
+    fields = {
+        key: source_text
+        for key, source_text in (("title", title_fr), ("description", description_fr), ("text", text_fr))
+        if source_text
+    }
+    # Long recipe text first so it is not the last request still running; the
+    # output keeps the title, description, text order of ``fields``.
+    schedule = sorted(fields, key=lambda key: len(fields[key]), reverse=True)
+
+    # Every language is independent: issue them concurrently, at most as many
+    # requests at once as the server decodes in parallel.
+    codes = [code for code in (language_code.lower() for language_code in languages) if code != "fr"]
+    pending_codes: List[str] = []
+    coros = []
+    for code in codes:
+        pending = {key: fields[key] for key in schedule if not is_language_agnostic(fields[key])}
+        if pending:
+            pending_codes.append(code)
+            coros.append(_translate_language(client, model, pending, code, sem, per_field))
+
+    results = await asyncio.gather(*coros, return_exceptions=True)
+    for values in results:
+        if isinstance(values, BaseException):
+            raise values
+    translations = dict(zip(pending_codes, results))
+
+    for code in codes:
+        values = translations.get(code, {})
+        for key, source_text in fields.items():
+            # Language-agnostic fields (numbers, symbols) are copied as they are.
+            translated[f"{key}_{code}"] = values.get(key, source_text)
 
     return translated
 
 
+async def _translate_file(
+    client: ollama.AsyncClient,
+    model: str,
+    recipe_path: str,
+    output_path: str,
+    languages: List[str],
+    label: str,
+    recipe_sem: asyncio.Semaphore,
+    request_sem: asyncio.Semaphore,
+    per_field: bool,
+    source_keys: Optional[SourceKeys] = None,
+) -> None:
+    async with recipe_sem:
+        print(f"{label} Translating: {os.path.basename(recipe_path)}")
+        start = time.perf_counter()
+
+        try:
+            recipe_data = await asyncio.to_thread(read_json, recipe_path)
+            translated = await translate_recipe(client, model, recipe_data, languages, request_sem, per_field)
+            await asyncio.to_thread(write_json, output_path, translated)
+            if source_keys is not None:
+                source_keys.record(os.path.splitext(os.path.basename(output_path))[0])
+        except Exception as exc:
+            elapsed = time.perf_counter() - start
+            print(f"   Error translating '{os.path.basename(recipe_path)}' after {elapsed:.2f}s: {exc}")
+            return
+
+        elapsed = time.perf_counter() - start
+        print(f"   Saved to {output_path} in {elapsed:.2f}s")
+
+
+async def translate_files(
+    client: ollama.AsyncClient,
+    model: str,
+    recipe_files: List[str],
+    output_dir: str,
+    languages: List[str],
+    parallel: int = DEFAULT_PARALLEL,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    per_field: bool = False,
+    existing: AbstractSet[str] = frozenset(),
+    source_keys: Optional[SourceKeys] = None,
+) -> None:
+    """Translate recipes as a pipeline: ``concurrency`` recipes in flight, ``parallel`` requests."""
+
+    global _USE_CHAT
+    _USE_CHAT = await probe_chat_async(client, model)
+    if not _USE_CHAT:
+        print("Warning: chat API unavailable, translating field by field with generate.")
+
+    recipe_sem = asyncio.Semaphore(max(1, concurrency))
+    request_sem = asyncio.Semaphore(max(1, parallel))
+    total = len(recipe_files)
+
+    async with asyncio.TaskGroup() as tg:
+        for idx, recipe_path in enumerate(recipe_files, start=1):
+            filename = os.path.basename(recipe_path)
+            output_path = os.path.join(output_dir, filename)
+
+            if filename in existing:
+                print(f"[{idx}/{total}] Skipping (exists): {filename}")
+                continue
+
+            tg.create_task(
+                _translate_file(
+                    client,
+                    model,
+                    recipe_path,
+                    output_path,
+                    languages,
+                    f"[{idx}/{total}]",
+                    recipe_sem,
+                    request_sem,
+                    per_field,
+                    source_keys,
+                )
+            )
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Translate recipe JSON files into multiple languages.")
     parser.add_argument(
@@ -150,9 +420,34 @@ def main() -> None:
         nargs="+",
         help="ISO language codes to translate to (e.g. en es de).",
     )
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=int(os.environ.get(NUM_PARALLEL_ENV) or DEFAULT_PARALLEL),
+        help="Maximum concurrent requests to the Ollama server (match its OLLAMA_NUM_PARALLEL).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.environ.get(CONCURRENCY_ENV) or DEFAULT_CONCURRENCY),
+        help="Maximum number of recipes in flight at once.",
+    )
+    parser.add_argument(
+        "--per-field",
+        action="store_true",
+        help="Translate each field with its own request instead of one JSON request per language.",
+    )
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        help="Print the context size chosen for each request and a per-bucket summary.",
+    )
 
     args = parser.parse_args()
 
+    global _DEBUG
+    _DEBUG = args.debug
+
     model = os.environ.get("OLLAMA_MODEL", TRANSLATOR_LLM)
     source_dir = os.environ.get("RECIPES_DIR", "data/json_recipes")
     output_dir = os.environ.get("OUTPUT_DIR", "data/translated_recipes")
@@ -175,48 +470,49 @@ def main() -> None:
 
     print("Target languages:", ", ".join(languages))
 
-    recipe_files = [
-        os.path.join(source_dir, name)
-        for name in sorted(os.listdir(source_dir))
-        if name.endswith(".json")
-    ]
+    with os.scandir(source_dir) as it:
+        recipe_files = sorted(entry.path for entry in it if entry.name.endswith(".json") and entry.is_file())
+    with os.scandir(output_dir) as it:
+        existing = {entry.name for entry in it}
+
+    # Translations of recipes regenerated since they were made are redone.
+    source_keys = SourceKeys(output_dir, source_dir)
+    stale = source_keys.stale(name[: -len(".json")] for name in existing if name.endswith(".json"))
+    if stale:
+        print(f"Re-translating {len(stale)} recipes regenerated since their translation.")
+        existing -= {f"{rid}.json" for rid in stale}
 
     total = len(recipe_files)
     if total == 0:
         print("No recipe files found to translate.")
         return
 
-    for idx, recipe_path in enumerate(recipe_files, start=1):
-        filename = os.path.basename(recipe_path)
-        output_path = os.path.join(output_dir, filename)
-
-        if os.path.exists(output_path):
-            print(f"[{idx}/{total}] Skipping (exists): {filename}")
-            continue
-
-        print(f"[{idx}/{total}] Translating: {filename}")
-        start = time.perf_counter()
-
-        try:
-            with open(recipe_path, "r", encoding="utf-8") as f:
-                recipe_data = json.load(f)
+    client = ollama.AsyncClient()
 
-            translated = translate_recipe(model, recipe_data, languages)
-
-            with open(output_path, "w", encoding="utf-8") as f:
-                json.dump(translated, f, ensure_ascii=False, indent=2)
-
-            elapsed = time.perf_counter() - start
-            print(f"   Saved to {output_path} in {elapsed:.2f}s")
-        except KeyboardInterrupt:
-            print("Interrupted by user. Exiting…")
-            sys.exit(1)
-        except Exception as exc:
-            elapsed = time.perf_counter() - start
-            print(f"   Error translating '{filename}' after {elapsed:.2f}s: {exc}")
-            continue
+    try:
+        asyncio.run(
+            translate_files(
+                client,
+                model,
+                recipe_files,
+                output_dir,
+                languages,
+                args.parallel,
+                args.concurrency,
+                args.per_field,
+                existing,
+                source_keys,
+            )
+        )
+    except KeyboardInterrupt:
+        print("Interrupted by user. Exiting…")
+        sys.exit(1)
+    finally:
+        fsync_dir(output_dir)
 
-        time.sleep(0.1)
+    if _DEBUG:
+        hits = ", ".join(f"{size}: {count}" for size, count in sorted(_CTX_BUCKET_HITS.items()))
+        print(f"Context buckets used (num_ctx: requests): {hits or 'none'}")
 
     print("Done.")
 
@@ -1,14 +1,16 @@
 import argparse
+import io
 import os
 import json
 import time
-import hashlib
+import random
 import sys
-import tempfile
-from typing import Dict, List, Optional, TypedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import AbstractSet, Dict, Iterator, List, Optional, Set, Tuple
 
 try:
     from mistralai import Mistral
+    from mistralai.models import SDKError
     from mistralai.models.file import File
 except Exception:
     print("Error: The 'mistralai' Python package is required to run this script.")
@@ -22,19 +24,36 @@ except Exception as e:
     print("Install with: pip install pandas")
     raise
 
+from recipe_outputs import (
+    RecipeEntry,
+    build_entries,
+    list_existing,
+    load_prompt_keys,
+    record_prompt_key,
+    recipe_exists,
+    strip_trailing_periods,
+)
+from script_helpers import build_http_client, json_dumps, json_loads, strip_code_fence, write_json
+
 CHEF_LLM = 'mistral-small-latest'
 API_KEY_ENV = "MISTRAL_API_KEY"
+BATCH_POLL_BACKOFF = 1.5
+BATCH_POLL_MAX_INTERVAL = 60.0
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+WRITE_CONCURRENCY = int(os.environ.get("WRITE_CONCURRENCY", "8"))
+HTTP_POOL_SIZE = 20
+MAX_RPM_ENV = "MISTRAL_MAX_RPM"
+MAX_TPM_ENV = "MISTRAL_MAX_TPM"
+DEFAULT_MAX_RPM = 60.0
+DEFAULT_MAX_TPM = 500_000.0
+# Rough per-call token estimate: prompt at ~4 characters per token plus a full recipe answer.
+CHARS_PER_TOKEN = 4
+EXPECTED_OUTPUT_TOKENS = 1024
+RETRY_ATTEMPTS = 4
+RETRY_MAX_DELAY = 60.0
 
 
-client = Mistral(api_key=os.environ.get("MISTRAL_API_KEY", ""))
-
-
-class RecipeEntry(TypedDict):
-    index: int
-    title: str
-    description: str
-    out_path: str
-    file_hash: str
+client = Mistral(api_key=os.environ.get("MISTRAL_API_KEY", ""), client=build_http_client(HTTP_POOL_SIZE))
 
 
 def _get_env_float(name: str, default: float) -> float:
@@ -47,10 +66,60 @@ def _get_env_float(name: str, default: float) -> float:
         return default
 
 
-def hash_title(title: str) -> str:
-    return hashlib.sha256(title.encode('utf-8')).hexdigest()
+class TokenBucket:
+    """Client-side requests- and tokens-per-minute budget for realtime calls (0 disables a limit)."""
+
+    def __init__(self, rpm: float, tpm: float) -> None:
+        self.rpm = rpm
+        self.tpm = tpm
+        # A bucket must hold at least one request/token, or a fractional rate
+        # (e.g. 0.5 RPM) could never accumulate enough to let a call through.
+        self._request_capacity = max(1.0, rpm)
+        self._token_capacity = max(1.0, tpm)
+        self._requests = self._request_capacity
+        self._tokens = self._token_capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self._request_capacity, self._requests + elapsed * self.rpm / 60.0)
+        self._tokens = min(self._token_capacity, self._tokens + elapsed * self.tpm / 60.0)
+
+    def acquire(self, tokens: int) -> None:
+        """Sleep just long enough for one request of ``tokens`` to fit both budgets."""
+        tokens = min(tokens, self._token_capacity) if self.tpm > 0 else 0
+        while True:
+            self._refill()
+            wait = 0.0
+            if self.rpm > 0 and self._requests < 1:
+                wait = (1 - self._requests) * 60.0 / self.rpm
+            if self.tpm > 0 and self._tokens < tokens:
+                wait = max(wait, (tokens - self._tokens) * 60.0 / self.tpm)
+            if wait <= 0:
+                break
+            time.sleep(wait)
+        self._requests -= 1
+        self._tokens -= tokens
+
+
+def _is_transient(exc: SDKError) -> bool:
+    status_code = getattr(exc, "status_code", None)
+    return status_code == 429 or (isinstance(status_code, int) and status_code >= 500)
+
+
+def _retry_after(exc: SDKError) -> Optional[float]:
+    """Seconds requested by the server's Retry-After header, if it sent a numeric one."""
+    response = getattr(exc, "raw_response", None)
+    value = response.headers.get("Retry-After") if response is not None else None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
 
 
+# Bump PROMPT_VERSION in recipe_outputs.py whenever this prompt changes meaningfully.
 def build_prompt(title: str, description: str) -> str:
     return (
         "Tu es un chef cuisinier français.\n\n"
@@ -102,12 +171,46 @@ def extract_text_from_response_body(body: Dict) -> str:
     return ""
 
 
-def generate_recipe_text(model: str, title: str, description: str) -> str:
+def iter_file_lines(file_id: str) -> Iterator[bytes]:
+    """Yield the lines of an uploaded file as it downloads, one line in memory at a time."""
+
+    response = client.files.download(file_id=file_id)
+    buffer = b""
+    try:
+        for chunk in response.iter_bytes(DOWNLOAD_CHUNK_SIZE):
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield line
+    finally:
+        response.close()
+
+    if buffer.strip():
+        yield buffer
+
+
+def generate_recipe_text(model: str, title: str, description: str, limiter: Optional[TokenBucket] = None) -> str:
     prompt = build_prompt(title, description)
-    response = client.chat.complete(
-        model=model,
-        messages=[{"role": "user", "content": prompt}],
-    )
+    tokens = len(prompt) // CHARS_PER_TOKEN + EXPECTED_OUTPUT_TOKENS
+
+    for attempt in range(1, RETRY_ATTEMPTS + 1):
+        if limiter is not None:
+            limiter.acquire(tokens)
+        try:
+            response = client.chat.complete(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+            )
+            break
+        except SDKError as exc:
+            if not _is_transient(exc) or attempt == RETRY_ATTEMPTS:
+                raise
+            delay = _retry_after(exc)
+            if delay is None:
+                delay = min(RETRY_MAX_DELAY, 2.0 ** attempt)
+            print(f"   API error {exc.status_code} for '{title}', retrying in {delay:.0f}s…")
+            time.sleep(delay)
 
     if not getattr(response, "choices", None):
         return ""
@@ -115,34 +218,42 @@ def generate_recipe_text(model: str, title: str, description: str) -> str:
     for choice in response.choices:
         message = getattr(choice, "message", None)
         if message and getattr(message, "content", None):
-            return message.content.strip()
+            return strip_code_fence(message.content.strip())
 
     return ""
 
 
-def generate_recipes_single(entries: List[RecipeEntry], model: str, total: int, sleep_between: float = 0.1) -> None:
+def generate_recipes_single(
+    entries: List[RecipeEntry],
+    model: str,
+    total: int,
+    existing: Set[str],
+    prompt_keys: Dict[str, str],
+    limiter: Optional[TokenBucket] = None,
+) -> None:
     for entry in entries:
         idx_display = entry["index"] + 1
         title = entry["title"]
         description = entry["description"]
         out_path = entry["out_path"]
 
-        if os.path.exists(out_path):
+        if recipe_exists(entry, existing, prompt_keys):
             print(f"[{idx_display}/{total}] Skipping (exists): {title}")
             continue
 
         print(f"[{idx_display}/{total}] Generating: {title}")
         start = time.perf_counter()
         try:
-            text = generate_recipe_text(model, title, description)
+            text = generate_recipe_text(model, title, description, limiter)
             if not text:
                 print(f"   Warning: empty response for '{title}', retrying once…")
                 time.sleep(0.5)
-                text = generate_recipe_text(model, title, description)
+                text = generate_recipe_text(model, title, description, limiter)
 
             data = {"title": title, "description": description, "text": text}
-            with open(out_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            write_json(out_path, data)
+            existing.add(os.path.basename(out_path))
+            record_prompt_key(entry, prompt_keys)
             elapsed = time.perf_counter() - start
             print(f"   Saved to {out_path} in {elapsed:.2f}s")
         except KeyboardInterrupt:
@@ -153,25 +264,25 @@ def generate_recipes_single(entries: List[RecipeEntry], model: str, total: int,
             print(f"   Error generating '{title}' after {elapsed:.2f}s: {e}")
             continue
 
-        if sleep_between > 0:
-            time.sleep(sleep_between)
-
 
 
 def generate_recipes_batch(
     entries: List[RecipeEntry],
     model: str,
     total: int,
+    existing: AbstractSet[str],
+    prompt_keys: Dict[str, str],
     poll_interval: float,
     timeout_minutes: float,
 ) -> List[RecipeEntry]:
-    pending = [entry for entry in entries if not os.path.exists(entry["out_path"])]
+    pending = [entry for entry in entries if not recipe_exists(entry, existing, prompt_keys)]
     if not pending:
         print("Batch mode: nothing to generate.")
         return []
 
     pending_map: Dict[str, RecipeEntry] = {entry["file_hash"]: entry for entry in pending}
-    request_lines: List[str] = []
+    # Build the JSONL in memory: no temp file to write, read back and delete.
+    batch_buffer = io.BytesIO()
     for entry in pending:
         body = {
             "model": model,
@@ -182,35 +293,28 @@ def generate_recipes_batch(
                 }
             ],
         }
-        request_lines.append(
-            json.dumps(
-                {
-                    "custom_id": entry["file_hash"],
-                    "method": "POST",
-                    "url": "/v1/chat/completions",
-                    "body": body,
-                },
-                ensure_ascii=False,
-            )
+        line = json_dumps(
+            {
+                "custom_id": entry["file_hash"],
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": body,
+            }
         )
-
-    with tempfile.NamedTemporaryFile("w", encoding="utf-8", suffix=".jsonl", delete=False) as tmp_file:
-        tmp_file.write("\n".join(request_lines) + "\n")
-        batch_path = tmp_file.name
+        batch_buffer.write(line + b"\n")
 
     fallback_entries: List[RecipeEntry] = []
     fallback_ids: set[str] = set()
 
     try:
-        with open(batch_path, "rb") as fh:
-            upload = client.files.upload(
-                file=File(
-                    fileName=os.path.basename(batch_path),
-                    content=fh,
-                    content_type="application/jsonl",
-                ),
-                purpose="batch",
-            )
+        upload = client.files.upload(
+            file=File(
+                fileName="recipes.jsonl",
+                content=batch_buffer.getvalue(),
+                content_type="application/jsonl",
+            ),
+            purpose="batch",
+        )
 
         job = client.batch.jobs.create(
             endpoint="/v1/chat/completions",
@@ -223,116 +327,118 @@ def generate_recipes_batch(
         if timeout_minutes > 0:
             deadline = time.perf_counter() + timeout_minutes * 60
 
-        poll_interval = poll_interval if poll_interval > 0 else 5.0
+        # Poll quickly at first so small jobs return fast, then back off (with
+        # jitter) so long jobs don't hammer the status endpoint.
+        delay = poll_interval if poll_interval > 0 else 1.0
 
         while job.status in ("QUEUED", "RUNNING"):
             if deadline and time.perf_counter() >= deadline:
                 print("   Batch wait timeout reached, leaving remaining recipes for fallback.")
                 break
-            time.sleep(poll_interval)
+            wait = delay * random.uniform(0.8, 1.2)
+            time.sleep(wait)
+            delay = min(delay * BATCH_POLL_BACKOFF, BATCH_POLL_MAX_INTERVAL)
             job = client.batch.jobs.get(job_id=job.id)
             print(
-                f"   Status: {job.status} ({job.completed_requests}/{job.total_requests} completed)"
+                f"   Status: {job.status} ({job.completed_requests}/{job.total_requests} completed, waited {wait:.1f}s)"
             )
 
         if job.status != "SUCCESS" or not job.output_file:
             print(f"Batch job {job.id} finished with status {job.status}.")
             if job.error_file:
                 try:
-                    error_response = client.files.download(file_id=job.error_file)
-                    error_text = error_response.read().decode("utf-8", errors="ignore")
-                    for line in error_text.splitlines():
-                        if line.strip():
-                            print(f"   Error detail: {line}")
+                    for line in iter_file_lines(job.error_file):
+                        print(f"   Error detail: {line.decode('utf-8', errors='ignore')}")
                 except Exception as error_exc:
                     print(f"   Failed to download error file: {error_exc}")
             return pending
 
-        output_response = client.files.download(file_id=job.output_file)
-        output_text = output_response.read().decode("utf-8", errors="ignore")
-
         processed_ids: set[str] = set()
-        for raw_line in output_text.splitlines():
-            if not raw_line.strip():
-                continue
-            try:
-                payload = json.loads(raw_line)
-            except json.JSONDecodeError:
-                print(f"   Warning: unable to parse batch line: {raw_line[:80]}…")
-                continue
-
-            custom_id = payload.get("custom_id")
-            if not isinstance(custom_id, str):
-                continue
-
-            processed_ids.add(custom_id)
-            entry = pending_map.get(custom_id)
-            if not entry:
-                continue
-
-            error_info = payload.get("error")
-            if error_info is not None:
-                message = error_info
-                if isinstance(error_info, dict):
-                    message = error_info.get("message") or error_info
-                print(f"   Batch error for '{entry['title']}': {message}")
-                if entry["file_hash"] not in fallback_ids:
-                    fallback_entries.append(entry)
-                    fallback_ids.add(entry["file_hash"])
-                continue
-
-            response_obj = payload.get("response")
-            body = None
-            if isinstance(response_obj, dict):
-                body = response_obj.get("body")
-                status_code = response_obj.get("status_code")
-                if isinstance(status_code, str):
-                    try:
-                        status_code = int(status_code)
-                    except ValueError:
-                        status_code = None
-                if isinstance(status_code, int) and status_code >= 400:
-                    print(
-                        f"   Batch HTTP {status_code} for '{entry['title']}', falling back to realtime call."
-                    )
+        # Disk writes go to a pool so they overlap with parsing the next lines.
+        writes: List[Tuple[RecipeEntry, Future]] = []
+        with ThreadPoolExecutor(max_workers=WRITE_CONCURRENCY) as writer:
+            for raw_line in iter_file_lines(job.output_file):
+                try:
+                    payload = json_loads(raw_line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    print(f"   Warning: unable to parse batch line: {raw_line[:80].decode('utf-8', errors='ignore')}…")
+                    continue
+
+                custom_id = payload.get("custom_id")
+                if not isinstance(custom_id, str):
+                    continue
+
+                processed_ids.add(custom_id)
+                entry = pending_map.get(custom_id)
+                if not entry:
+                    continue
+
+                error_info = payload.get("error")
+                if error_info is not None:
+                    message = error_info
+                    if isinstance(error_info, dict):
+                        message = error_info.get("message") or error_info
+                    print(f"   Batch error for '{entry['title']}': {message}")
+                    if entry["file_hash"] not in fallback_ids:
+                        fallback_entries.append(entry)
+                        fallback_ids.add(entry["file_hash"])
+                    continue
+
+                response_obj = payload.get("response")
+                body = None
+                if isinstance(response_obj, dict):
+                    body = response_obj.get("body")
+                    status_code = response_obj.get("status_code")
+                    if isinstance(status_code, str):
+                        try:
+                            status_code = int(status_code)
+                        except ValueError:
+                            status_code = None
+                    if isinstance(status_code, int) and status_code >= 400:
+                        print(
+                            f"   Batch HTTP {status_code} for '{entry['title']}', falling back to realtime call."
+                        )
+                        if entry["file_hash"] not in fallback_ids:
+                            fallback_entries.append(entry)
+                            fallback_ids.add(entry["file_hash"])
+                        continue
+                    if isinstance(body, str):
+                        try:
+                            body = json_loads(body)
+                        except json.JSONDecodeError:
+                            body = None
+
+                if not isinstance(body, dict):
+                    print(f"   Missing batch response for '{entry['title']}', falling back.")
                     if entry["file_hash"] not in fallback_ids:
                         fallback_entries.append(entry)
                         fallback_ids.add(entry["file_hash"])
                     continue
-                if isinstance(body, str):
-                    try:
-                        body = json.loads(body)
-                    except json.JSONDecodeError:
-                        body = None
-
-            if not isinstance(body, dict):
-                print(f"   Missing batch response for '{entry['title']}', falling back.")
-                if entry["file_hash"] not in fallback_ids:
-                    fallback_entries.append(entry)
-                    fallback_ids.add(entry["file_hash"])
-                continue
-
-            text = extract_text_from_response_body(body)
-            if not text:
-                print(f"   Empty batch response for '{entry['title']}', falling back.")
-                if entry["file_hash"] not in fallback_ids:
-                    fallback_entries.append(entry)
-                    fallback_ids.add(entry["file_hash"])
-                continue
-
-            if text.startswith("```"):
-                text = text[text.find("\n")+1:]
-            if text.strip().endswith("```"):
-                text = text[:text.rfind("\n")]
-
-            data = {
-                "title": entry["title"],
-                "description": entry["description"],
-                "text": text,
-            }
-            with open(entry["out_path"], "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            print(f"[{entry['index'] + 1}/{total}] Saved from batch: {entry['title']}")
+
+                text = extract_text_from_response_body(body)
+                if not text:
+                    print(f"   Empty batch response for '{entry['title']}', falling back.")
+                    if entry["file_hash"] not in fallback_ids:
+                        fallback_entries.append(entry)
+                        fallback_ids.add(entry["file_hash"])
+                    continue
+
+                text = strip_code_fence(text)
+
+                data = {
+                    "title": entry["title"],
+                    "description": entry["description"],
+                    "text": text,
+                }
+                writes.append((entry, writer.submit(write_json, entry["out_path"], data)))
+
+        for entry, write in writes:
+            try:
+                write.result()
+                record_prompt_key(entry, prompt_keys)
+                print(f"[{entry['index'] + 1}/{total}] Saved from batch: {entry['title']}")
+            except Exception as exc:
+                print(f"   Error writing '{entry['title']}': {exc}")
 
         for entry in pending:
             if entry["file_hash"] not in processed_ids and entry["file_hash"] not in fallback_ids:
@@ -347,11 +453,6 @@ def generate_recipes_batch(
     except Exception as exc:
         print(f"Batch generation failed: {exc}")
         return pending
-    finally:
-        try:
-            os.remove(batch_path)
-        except OSError:
-            pass
 
 def main():
     parser = argparse.ArgumentParser(description="Generate recipe JSON files with Mistral AI.")
@@ -363,8 +464,8 @@ def main():
     parser.add_argument(
         "--batch-poll-interval",
         type=float,
-        default=_get_env_float("MISTRAL_BATCH_POLL_INTERVAL", 5.0),
-        help="Seconds between batch status checks.",
+        default=_get_env_float("MISTRAL_BATCH_POLL_INTERVAL", 1.0),
+        help="Initial seconds between batch status checks (grows 1.5x per check up to 60s).",
     )
     parser.add_argument(
         "--batch-timeout-minutes",
@@ -372,6 +473,18 @@ def main():
         default=_get_env_float("MISTRAL_BATCH_TIMEOUT_MINUTES", 30.0),
         help="Maximum minutes to wait for a batch job before falling back (0 to disable).",
     )
+    parser.add_argument(
+        "--max-rpm",
+        type=float,
+        default=_get_env_float(MAX_RPM_ENV, DEFAULT_MAX_RPM),
+        help="Realtime requests per minute allowed by your Mistral tier (0 to disable).",
+    )
+    parser.add_argument(
+        "--max-tpm",
+        type=float,
+        default=_get_env_float(MAX_TPM_ENV, DEFAULT_MAX_TPM),
+        help="Realtime tokens per minute allowed by your Mistral tier (0 to disable).",
+    )
     args = parser.parse_args()
 
     model = os.environ.get("MISTRAL_MODEL", CHEF_LLM)
@@ -384,38 +497,33 @@ def main():
         sys.exit(1)
 
     recipes = pd.read_csv("recipes.csv")
-    recipes["description"] = [d[:-1] if isinstance(d, str) and d.endswith('.') else d for d in recipes["description"]]
-
-    total = len(recipes)
-    entries: List[RecipeEntry] = []
-    for i in range(total):
-        title = recipes["title"].iloc[i]
-        description = recipes["description"].iloc[i]
-        file_hash = hash_title(title)
-        out_path = os.path.join(output_dir, f"{file_hash}.json")
-        entries.append(
-            {
-                "index": i,
-                "title": title,
-                "description": description,
-                "out_path": out_path,
-                "file_hash": file_hash,
-            }
-        )
+    recipes["description"] = strip_trailing_periods(recipes["description"])
+
+    # Plain dicts once up front instead of positional Series lookups per row.
+    records = recipes[["title", "description"]].to_dict(orient="records")
+
+    entries = build_entries(records, output_dir)
+    total = len(entries)
+    existing = list_existing(output_dir)
+    prompt_keys = load_prompt_keys(output_dir)
+
+    limiter = TokenBucket(args.max_rpm, args.max_tpm)
 
     if args.batch:
         fallback_entries = generate_recipes_batch(
             entries=entries,
             model=model,
             total=total,
+            existing=existing,
+            prompt_keys=prompt_keys,
             poll_interval=args.batch_poll_interval,
             timeout_minutes=args.batch_timeout_minutes,
         )
         if fallback_entries:
             print(f"Falling back to realtime generation for {len(fallback_entries)} recipes…")
-            generate_recipes_single(fallback_entries, model, total)
+            generate_recipes_single(fallback_entries, model, total, existing, prompt_keys, limiter)
     else:
-        generate_recipes_single(entries, model, total)
+        generate_recipes_single(entries, model, total, existing, prompt_keys, limiter)
 
     print("Done.")
 
@@ -1,8 +1,7 @@
 import os
-import json
 import time
-import hashlib
 import sys
+from typing import Optional
 
 try:
     import ollama
@@ -18,14 +17,25 @@ except Exception as e:
     print("Install with: pip install pandas")
     raise
 
+from recipe_outputs import (
+    build_entries,
+    list_existing,
+    load_prompt_keys,
+    record_prompt_key,
+    recipe_exists,
+    strip_trailing_periods,
+)
+from script_helpers import probe_chat, strip_code_fence, write_json
 
-CHEF_LLM = 'mistral'
 
+CHEF_LLM = 'mistral'
 
-def hash_title(title: str) -> str:
-    return hashlib.sha256(title.encode('utf-8')).hexdigest()
+# Whether the server answers the chat API. Probed once, so a server without it
+# doesn't pay a failed chat request before every generate call.
+_USE_CHAT: Optional[bool] = None
 
 
+# Bump PROMPT_VERSION in recipe_outputs.py whenever this prompt changes meaningfully.
 def build_prompt(title: str, description: str) -> str:
     return (
         "Tu es un chef cuisinier français.\n\n"
@@ -44,53 +54,69 @@ def build_prompt(title: str, description: str) -> str:
     )
 
 
-def generate_recipe_text(model: str, title: str, description: str) -> str:
+def generate_recipe_text(client: ollama.Client, model: str, title: str, description: str) -> str:
+    global _USE_CHAT
     prompt = build_prompt(title, description)
-    try:
+    if _USE_CHAT is None:
+        _USE_CHAT = probe_chat(client, model)
+    if _USE_CHAT:
         # Prefer chat for better instruction-following
-        response = ollama.chat(
+        response = client.chat(
             model=model,
             messages=[{"role": "user", "content": prompt}],
         )
-        return response.get("message", {}).get("content", "").strip()
-    except Exception:
-        # Fallback to generate API if chat fails
-        resp = ollama.generate(model=model, prompt=prompt)
-        return resp.get("response", "").strip()
+        return strip_code_fence(response.get("message", {}).get("content", "").strip())
+    # Fallback to generate API if chat isn't available
+    resp = client.generate(model=model, prompt=prompt)
+    return strip_code_fence(resp.get("response", "").strip())
 
 
 def main():
+    global _USE_CHAT
     model = os.environ.get("OLLAMA_MODEL", CHEF_LLM)
     output_dir = os.environ.get("OUTPUT_DIR", "data/json_recipes")
     os.makedirs(output_dir, exist_ok=True)
 
+    # One client for the whole run so every request reuses the same keep-alive connection.
+    client = ollama.Client(host=os.environ.get("OLLAMA_HOST"))
+
+    _USE_CHAT = probe_chat(client, model)
+    if not _USE_CHAT:
+        print("Warning: chat API unavailable, using generate for all recipes.")
+
     recipes = pd.read_csv('recipes.csv')
-    recipes['description'] = [d[:-1] if d.endswith('.') else d for d in recipes['description']]
+    recipes['description'] = strip_trailing_periods(recipes['description'])
+
+    # Plain dicts once up front instead of positional Series lookups per row.
+    records = recipes[['title', 'description']].to_dict(orient='records')
 
-    total = len(recipes)
-    for i in range(total):
-        title = recipes['title'].iloc[i]
-        description = recipes['description'].iloc[i]
+    entries = build_entries(records, output_dir)
+    total = len(entries)
+    existing = list_existing(output_dir)
+    prompt_keys = load_prompt_keys(output_dir)
 
-        file_hash = hash_title(title)
-        out_path = os.path.join(output_dir, f"{file_hash}.json")
+    for i, entry in enumerate(entries):
+        title = entry['title']
+        description = entry['description']
+        out_path = entry['out_path']
 
-        if os.path.exists(out_path):
+        if recipe_exists(entry, existing, prompt_keys):
             print(f"[{i+1}/{total}] Skipping (exists): {title}")
             continue
 
         print(f"[{i+1}/{total}] Generating: {title}")
         start = time.perf_counter()
         try:
-            text = generate_recipe_text(model, title, description)
+            text = generate_recipe_text(client, model, title, description)
             if not text:
                 print(f"   Warning: empty response for '{title}', retrying once…")
                 time.sleep(0.5)
-                text = generate_recipe_text(model, title, description)
+                text = generate_recipe_text(client, model, title, description)
 
             data = {"title": title, "description": description, "text": text}
-            with open(out_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            write_json(out_path, data)
+            existing.add(os.path.basename(out_path))
+            record_prompt_key(entry, prompt_keys)
             elapsed = time.perf_counter() - start
             print(f"   Saved to {out_path} in {elapsed:.2f}s")
         except KeyboardInterrupt:
@@ -5,35 +5,38 @@ Inputs
 - Parquet file with columns at least: `id` (optional), `title`, `text`, `embedding` (list[float])
 
 What it does
-- Loads the parquet into a Pandas DataFrame
+- Loads the parquet with PyArrow and packs embeddings as FixedSizeList<float32>
 - Connects to a LanceDB database directory (created if needed)
 - Creates/overwrites a table and writes the data
 - Builds an IVF_FLAT vector index on `embedding`
-- Builds a full-text search index on `title`, `description`, and `text`
+- Builds a full-text search index on `title`, `description`, `text` and their `_<lang>` variants
 
 Usage
-  pip install lancedb pandas pyarrow
+  pip install lancedb numpy pyarrow
   python scripts/index_recipes.py --parquet data/recipes.parquet --db ./recipes.db --table recipes --overwrite
 
 Notes
 - Requires a recent LanceDB version with IVF_FLAT vector indexing and Tantivy-based FTS.
 - Default vector metric is "cosine". Choose "dot" only when embeddings are unit-normalized.
 - Full-text indexing is optimized for French recipe content.
+- `--float16` halves vector storage and index memory traffic. Recall loss for sentence
+  embeddings is usually negligible, but compare search results before switching a production index.
 """
 
 from __future__ import annotations
 
 import argparse
+import math
 import sys
 from pathlib import Path
-from typing import Any, List
 
 
 def _require_deps():
     try:
-        import pandas as pd  # noqa: F401
+        import numpy  # noqa: F401
+        import pyarrow  # noqa: F401
     except Exception:
-        print("Error: pandas is required. Install with: pip install pandas", file=sys.stderr)
+        print("Error: numpy and pyarrow are required. Install with: pip install numpy pyarrow", file=sys.stderr)
         raise
     try:
         import lancedb  # noqa: F401
@@ -42,46 +45,48 @@ def _require_deps():
         raise
 
 
-def _to_list(vec: Any) -> List[float] | None:
-    try:
-        import numpy as np  # type: ignore
-    except Exception:
-        np = None  # Optional dependency
-
-    if vec is None:
-        return None
-    if isinstance(vec, list):
-        return [float(x) for x in vec]
-    if isinstance(vec, tuple):
-        return [float(x) for x in vec]
-    if np is not None and isinstance(vec, (np.ndarray,)):
-        return [float(x) for x in vec.tolist()]
-    # PyArrow list-like may show up as arrays; last resort
-    try:
-        return [float(x) for x in list(vec)]
-    except Exception:
-        return None
+def _load_recipes(parquet_path: Path, float16: bool = False):
+    """Read the Parquet file, returning an Arrow table and its (N, D) embedding matrix.
 
+    The table's `embedding` column is rebuilt as FixedSizeList<float32> (or float16) over the
+    matrix buffer, so LanceDB receives contiguous vectors instead of Python lists.
+    """
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
 
-def _ensure_embeddings(df):
-    if "embedding" not in df.columns:
+    table = pq.read_table(parquet_path)
+    if "embedding" not in table.column_names:
         raise ValueError("Column 'embedding' not found in the Parquet file.")
-    df["embedding"] = df["embedding"].apply(_to_list)
-    # Drop rows with missing/invalid embeddings
-    before = len(df)
-    df = df.dropna(subset=["embedding"]).reset_index(drop=True)
-    if len(df) < before:
-        print(f"Dropped {before - len(df)} rows with invalid embeddings")
-    # Validate consistent dimensionality
-    dims = {len(v) for v in df["embedding"]}
-    if len(dims) != 1:
-        raise ValueError(f"Inconsistent embedding dimensions detected: {sorted(dims)}")
-    return df
+    # Drop rows with missing embeddings
+    before = table.num_rows
+    table = table.filter(pc.is_valid(table.column("embedding")))
+    if table.num_rows < before:
+        print(f"Dropped {before - table.num_rows} rows with invalid embeddings")
+    if table.num_rows == 0:
+        raise ValueError("No rows with embeddings found in the Parquet file.")
+
+    # One Arrow -> NumPy conversion instead of a Python list per row
+    vectors = table.column("embedding").to_numpy(zero_copy_only=False)
+    try:
+        mat = np.stack(vectors).astype(np.float32, copy=False)
+    except ValueError as exc:
+        raise ValueError(f"Inconsistent embedding dimensions detected: {exc}") from exc
+    if mat.ndim != 2:
+        raise ValueError(f"Expected one embedding vector per row, got array of shape {mat.shape}")
+    if float16:
+        mat = mat.astype(np.float16)
+
+    dim = mat.shape[1]
+    value_type = pa.float16() if float16 else pa.float32()
+    embeddings = pa.FixedSizeListArray.from_arrays(pa.array(mat.reshape(-1), type=value_type), dim)
+    table = table.drop_columns(["embedding"]).append_column("embedding", embeddings)
+    return table, mat
 
 
 def main():
     _require_deps()
-    import pandas as pd
     import lancedb
 
     parser = argparse.ArgumentParser(description="Index recipes in LanceDB from a Parquet file")
@@ -95,6 +100,17 @@ def main():
         help="Vector metric (default: cosine). Use 'dot' only if embeddings are unit-normalized.",
     )
     parser.add_argument("--overwrite", action="store_true", help="Overwrite existing table if present")
+    parser.add_argument(
+        "--float16",
+        action="store_true",
+        help="Store embeddings as float16: half the size and memory traffic, at a small recall cost.",
+    )
+    parser.add_argument(
+        "--num-partitions",
+        type=int,
+        default=None,
+        help="IVF partitions for the vector index (default: sqrt of the row count, at least 16).",
+    )
 
     args = parser.parse_args()
     parquet_path = Path(args.parquet)
@@ -104,15 +120,15 @@ def main():
         print(f"Parquet file not found: {parquet_path}", file=sys.stderr)
         sys.exit(1)
 
-    print(f"Loading DataFrame from: {parquet_path}")
-    df = pd.read_parquet(parquet_path)
+    print(f"Loading recipes from: {parquet_path}")
+    table, mat = _load_recipes(parquet_path, float16=args.float16)
     expected_cols = {"title", "description", "text", "embedding"}
-    missing = expected_cols - set(df.columns)
+    missing = expected_cols - set(table.column_names)
     if missing:
         print(f"Warning: Parquet missing columns: {sorted(missing)}")
 
-    df = _ensure_embeddings(df)
-    print(f"Loaded {len(df)} rows. Embedding dim: {len(df['embedding'].iloc[0])}")
+    dim = mat.shape[1]
+    print(f"Loaded {table.num_rows} rows. Embedding dim: {dim} ({mat.dtype})")
 
     print(f"Connecting LanceDB at: {db_path}")
     db = lancedb.connect(str(db_path))
@@ -126,20 +142,23 @@ def main():
             pass
 
     print(f"Creating table '{args.table}' (mode={mode})...")
-    tbl = db.create_table(args.table, data=df, mode="overwrite" if args.overwrite else "create")
+    tbl = db.create_table(args.table, data=table, mode="overwrite" if args.overwrite else "create")
 
-    print("Building IVF_FLAT vector index on 'embedding'...")
+    # Query cost ~ N / partitions + partitions, minimized around sqrt(N)
+    num_partitions = args.num_partitions or max(16, int(math.sqrt(table.num_rows)))
+    num_partitions = max(1, min(num_partitions, table.num_rows))
+    print(f"Building IVF_FLAT vector index on 'embedding' ({num_partitions} partitions)...")
     tbl.create_index(
         vector_column_name="embedding",
         index_type="IVF_FLAT",
         metric=args.metric,
+        num_partitions=num_partitions,
     )
 
-    fts_columns = []
-    for col in df.columns:
-        for prefix in ("title_", "description_", "text_"):
-            if col.startswith(prefix):
-                fts_columns.append(col)
+    # Base columns plus their per-language variants (title_fr, text_en, ...); one pass, no duplicates
+    fts_fields = ("title", "description", "text")
+    fts_prefixes = tuple(f"{field}_" for field in fts_fields)
+    fts_columns = [col for col in table.column_names if col in fts_fields or col.startswith(fts_prefixes)]
     print(f"Creating French FTS index on {fts_columns}...")
     tbl.create_fts_index(
         field_names=fts_columns,
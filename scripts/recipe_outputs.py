@@ -0,0 +1,172 @@
+"""On-disk layout of generated recipes, shared by the generators and the scripts reading their output.
+
+Each recipe is stored as ``<blake2b(title)>.json`` in the output directory, next to an
+append-only ``.prompt_keys`` sidecar that records which prompt produced each file.
+Translations and images record the prompt key of the recipe they were made from in
+their own ``.source_keys`` sidecar, so a regenerated recipe invalidates them.
+"""
+
+import os
+import hashlib
+import threading
+from typing import TYPE_CHECKING, AbstractSet, Any, Dict, Iterable, List, Set, Tuple, TypedDict
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Bump whenever build_prompt changes meaningfully: every recipe is regenerated.
+PROMPT_VERSION = 1
+PROMPT_KEYS_FILE = ".prompt_keys"
+SOURCE_KEYS_FILE = ".source_keys"
+
+
+class RecipeEntry(TypedDict):
+    index: int
+    title: str
+    description: str
+    out_path: str
+    legacy_path: str
+    file_hash: str
+    prompt_key: str
+
+
+def hash_title(title: str) -> str:
+    return hashlib.blake2b(title.encode('utf-8'), digest_size=32).hexdigest()
+
+
+def legacy_hash_title(title: str) -> str:
+    """SHA-256 filename used before the switch to BLAKE2; still honoured when skipping."""
+    return hashlib.sha256(title.encode('utf-8')).hexdigest()
+
+
+def prompt_key(title: str, description: str) -> str:
+    """Fingerprint of everything that goes into a recipe's prompt."""
+    return hashlib.blake2b(f"{PROMPT_VERSION}|{title}|{description}".encode('utf-8'), digest_size=16).hexdigest()
+
+
+def list_existing(output_dir: str) -> Set[str]:
+    """File names already in ``output_dir``, listed once instead of stat-ing every entry."""
+    with os.scandir(output_dir) as it:
+        return {entry.name for entry in it if entry.is_file()}
+
+
+def strip_trailing_periods(descriptions: "pd.Series") -> "pd.Series":
+    """Vectorized trailing-period strip; missing and non-string values are left as they were."""
+    try:
+        # The .str methods return NaN for every non-string value.
+        stripped = descriptions.str.removesuffix(".")
+    except AttributeError:
+        # No strings at all (e.g. an all-empty column read as float).
+        return descriptions
+    return stripped.where(stripped.notna(), descriptions)
+
+
+def build_entries(records: List[Dict[str, Any]], output_dir: str) -> List[RecipeEntry]:
+    """One entry per distinct title, keeping the first row of any duplicates.
+
+    Files are named after the title alone, so two rows sharing a title would
+    overwrite each other and regenerate on every run.
+    """
+    entries: List[RecipeEntry] = []
+    seen: Set[str] = set()
+    for row, record in enumerate(records):
+        title = record["title"]
+        description = record["description"]
+        if title in seen:
+            print(f"Warning: skipping duplicate title on row {row + 1}: {title}")
+            continue
+        seen.add(title)
+        file_hash = hash_title(title)
+        entries.append(
+            {
+                "index": len(entries),
+                "title": title,
+                "description": description,
+                "out_path": os.path.join(output_dir, f"{file_hash}.json"),
+                "legacy_path": os.path.join(output_dir, f"{legacy_hash_title(title)}.json"),
+                "file_hash": file_hash,
+                "prompt_key": prompt_key(title, description),
+            }
+        )
+    return entries
+
+
+def _load_keys(path: str) -> Dict[str, str]:
+    """Read an append-only ``<name> <key>`` sidecar; later lines win."""
+    keys: Dict[str, str] = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2:
+                    keys[parts[0]] = parts[1]
+    except FileNotFoundError:
+        pass
+    return keys
+
+
+def load_prompt_keys(output_dir: str) -> Dict[str, str]:
+    """Prompt key of every recipe file in ``output_dir``, by file name."""
+    return _load_keys(os.path.join(output_dir, PROMPT_KEYS_FILE))
+
+
+def record_prompt_key(entry: RecipeEntry, prompt_keys: Dict[str, str]) -> None:
+    filename = os.path.basename(entry["out_path"])
+    with open(os.path.join(os.path.dirname(entry["out_path"]), PROMPT_KEYS_FILE), "a", encoding="utf-8") as f:
+        f.write(f"{filename} {entry['prompt_key']}\n")
+    prompt_keys[filename] = entry["prompt_key"]
+
+
+def recipe_exists(entry: RecipeEntry, existing: AbstractSet[str], prompt_keys: Dict[str, str]) -> bool:
+    """True when the recipe is on disk and was generated from the current title, description and prompt."""
+    filename = os.path.basename(entry["out_path"])
+    if filename in existing:
+        # Outputs written before keys were recorded are trusted as they are.
+        recorded = prompt_keys.get(filename)
+        return recorded is None or recorded == entry["prompt_key"]
+    return os.path.basename(entry["legacy_path"]) in existing
+
+
+
+class SourceKeys:
+    """Which version of its recipe each translation or image was made from.
+
+    Outputs are identified by the recipe's file stem. Outputs found without a
+    recorded key (made before keys were tracked) are adopted as current.
+    """
+
+    def __init__(self, output_dir: str, recipes_dir: str) -> None:
+        self._path = os.path.join(output_dir, SOURCE_KEYS_FILE)
+        self._recipe_keys = load_prompt_keys(recipes_dir)
+        self._recorded = _load_keys(self._path)
+        self._lock = threading.Lock()
+
+    def stale(self, existing_ids: Iterable[str]) -> Set[str]:
+        """Ids among ``existing_ids`` whose recipe was regenerated since the output was made."""
+        stale: Set[str] = set()
+        adopted: List[Tuple[str, str]] = []
+        for rid in existing_ids:
+            source = self._recipe_keys.get(f"{rid}.json")
+            if source is None:
+                continue
+            recorded = self._recorded.get(rid)
+            if recorded is None:
+                adopted.append((rid, source))
+            elif recorded != source:
+                stale.add(rid)
+        self._append(adopted)
+        return stale
+
+    def record(self, rid: str) -> None:
+        """Note that the output for ``rid`` was just made from the current recipe."""
+        source = self._recipe_keys.get(f"{rid}.json")
+        if source is not None:
+            self._append([(rid, source)])
+
+    def _append(self, pairs: List[Tuple[str, str]]) -> None:
+        if not pairs:
+            return
+        with self._lock:
+            with open(self._path, "a", encoding="utf-8") as f:
+                f.writelines(f"{rid} {key}\n" for rid, key in pairs)
+            self._recorded.update(pairs)
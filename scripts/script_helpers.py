@@ -0,0 +1,120 @@
+"""Helpers shared by the generation and translation scripts.
+
+The scripts are run directly (``python scripts/<name>.py``), so this module is
+imported as a sibling rather than as part of a package.
+"""
+
+import importlib.util
+import json
+import os
+import re
+from typing import TYPE_CHECKING, Any, Dict, Union
+
+if TYPE_CHECKING:
+    import httpx
+
+try:
+    import orjson
+except ImportError:  # Optional speed-up; the stdlib json module is used without it.
+    orjson = None
+
+FENCE_RE = re.compile(r"^\s*```[^\n]*\n(.*?)\n```\s*$", re.DOTALL)
+
+
+def json_loads(raw: Union[str, bytes]) -> Any:
+    """Parse JSON, with orjson when it is installed."""
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def json_dumps(data: Any, indent: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(data, ensure_ascii=False, indent=2 if indent else None).encode("utf-8")
+
+
+def read_json(path: str) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        return json_loads(f.read())
+
+
+def write_json(path: str, data: Dict[str, Any]) -> None:
+    """Write ``data`` through a fsynced temporary file and rename it into place.
+
+    Neither an interrupted run nor a power loss can leave a truncated file that a
+    later run would skip as done.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(json_dumps(data, indent=True))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def fsync_dir(path: str) -> None:
+    """Persist the renames done in ``path`` with one directory fsync at the end of the run."""
+
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def strip_code_fence(text: str) -> str:
+    """Unwrap text the model returned inside a single Markdown code fence."""
+    if "```" not in text:
+        return text
+    m = FENCE_RE.match(text)
+    return m.group(1) if m else text
+
+
+def _http_client_options(pool_size: int) -> Dict[str, Any]:
+    import httpx
+
+    return {
+        "http2": importlib.util.find_spec("h2") is not None,
+        "limits": httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        "timeout": httpx.Timeout(120.0, connect=10.0),
+    }
+
+
+def build_http_client(pool_size: int) -> "httpx.Client":
+    """Shared keep-alive HTTP client so requests reuse pooled TLS connections."""
+    import httpx
+
+    return httpx.Client(**_http_client_options(pool_size))
+
+
+def build_async_http_client(pool_size: int) -> "httpx.AsyncClient":
+    """Async counterpart of ``build_http_client``, used by every ``*_async`` SDK call."""
+    import httpx
+
+    return httpx.AsyncClient(**_http_client_options(pool_size))
+
+
+_PROBE = {"messages": [{"role": "user", "content": "ping"}], "options": {"num_predict": 1}}
+
+
+def probe_chat(client: Any, model: str) -> bool:
+    """Check once whether an Ollama server answers the chat API, instead of failing over on every call."""
+    try:
+        client.chat(model=model, **_PROBE)
+    except Exception:
+        return False
+    return True
+
+
+async def probe_chat_async(client: Any, model: str) -> bool:
+    """``probe_chat`` for an ``ollama.AsyncClient``."""
+    try:
+        await client.chat(model=model, **_PROBE)
+    except Exception:
+        return False
+    return True